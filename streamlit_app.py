@@ -1,114 +1,961 @@
+import collections
+import csv
+import functools
+import io
+import math
+import pathlib
+
 import streamlit as st
+import numpy as np
 import pandas as pd
 import streamlit.components.v1 as components
 
 
-def format_negatives(val):
-    """Return '(x.xx)' for negative floats, or 'x.xx' if positive."""
-    if isinstance(val, (int, float)):
-        return f"({abs(val):,.2f})" if val < 0 else f"{val:,.2f}"
-    return val
+# ------------------------------------------------------------------
+# STATIC CSS / JS (plain constants; Streamlit re-executes this module on
+# every rerun, so anything costly to derive sits behind st.cache_*)
+# ------------------------------------------------------------------
+# Page, download-button and table styles live in one stylesheet
+_STYLES_PATH = pathlib.Path(__file__).parent / "styles" / "rcf.css"
+
+# One shared exporter for every image button. The tables live in the parent
+# page; start/end slice them by position and several are laid side by side.
+# html2canvas comes from the CDN on the first image click, so plain page loads
+# never download it.
+_HTML2CANVAS_JS = """
+<script>
+function loadHtml2canvas() {
+    if (window.html2canvas) {
+        return Promise.resolve();
+    }
+    return new Promise((resolve, reject) => {
+        const script = document.createElement('script');
+        script.src = 'https://html2canvas.hertzen.com/dist/html2canvas.min.js';
+        script.onload = resolve;
+        script.onerror = reject;
+        document.head.appendChild(script);
+    });
+}
+
+async function downloadTablesImage(filename, start, end) {
+    await loadHtml2canvas();
+    const tables = Array.from(window.parent.document.querySelectorAll('.rcf-table')).slice(start, end);
+    const options = {
+        scale: window.devicePixelRatio || 1,
+        useCORS: true,
+        backgroundColor: '#ffffff'
+    };
+
+    let combinedCanvas;
+    if (tables.length === 1) {
+        combinedCanvas = await html2canvas(tables[0], options);
+    } else {
+        // Size the composite from the laid-out tables, then rasterise them one
+        // at a time straight into it so only one intermediate canvas is alive
+        const rects = tables.map(table => table.getBoundingClientRect());
+        combinedCanvas = document.createElement('canvas');
+        combinedCanvas.width = Math.ceil(rects.reduce((sum, rect) => sum + rect.width, 0) * options.scale);
+        combinedCanvas.height = Math.ceil(Math.max(...rects.map(rect => rect.height)) * options.scale);
+
+        const ctx = combinedCanvas.getContext('2d');
+        let xOffset = 0;
+        for (const table of tables) {
+            const canvas = await html2canvas(table, options);
+            ctx.drawImage(canvas, xOffset, 0);
+            xOffset += canvas.width;
+        }
+    }
 
+    const link = document.createElement('a');
+    link.href = combinedCanvas.toDataURL('image/png', 1.0);
+    link.download = filename;
+    document.body.appendChild(link);
+    link.click();
+    document.body.removeChild(link);
+}
+</script>
+"""
+
+_SCREENSHOT_BUTTON = """
+<button onclick="downloadTablesImage('table.png', 0, 1)" 
+        style="width: 100%; padding: 12px 20px; 
+        background-color: #2B6CB0; color: white; 
+        border: none; border-radius: 4px; 
+        cursor: pointer; font-family: -apple-system, system-ui;
+        font-size: 14px; font-weight: 500;
+        margin: 10px 0;">
+    📸 Download as Image
+</button>
+"""
+
+_IMAGE_BUTTON = """
+<div style='width: 100%; padding: 10px 0;'>
+    <button onclick="downloadTablesImage({args})" 
+            style="width: 100%;
+                   background-color: rgb(43, 108, 176);
+                   color: white;
+                   padding: 0.6rem 0.6rem;
+                   border: none;
+                   border-radius: 0.25rem;
+                   cursor: pointer;
+                   font-weight: 500;
+                   font-size: 1rem;
+                   line-height: 1.4;
+                   transition: background-color 0.2s;">
+        📷 Download Image
+    </button>
+</div>
+"""
 
-def highlight_subsections(html_table, highlight_color="#FFF7D1"):
+# Exporter plus button for each image download: the NO CLN table is the first
+# on the page, the table being exported the last, a side-by-side pair the last two
+_SCREENSHOT_HTML = "".join((_HTML2CANVAS_JS, _SCREENSHOT_BUTTON))
+_TABLE_IMAGE_BUTTON = "".join((_HTML2CANVAS_JS, _IMAGE_BUTTON.format(args="'comparison_table.png', -1")))
+_TABLES_IMAGE_BUTTON = "".join((_HTML2CANVAS_JS, _IMAGE_BUTTON.format(args="'comparison_tables.png', -2")))
+
+# Explanation tab body, sent as a single element instead of ~40 markdown/latex calls
+_EXPLANATION_MD = r"""
+## Overview
+The RCF-CLN Calculator determines the profitability and returns for Revolving Credit Facilities (RCF).
+The calculations consider both drawn and undrawn portions of the facility.
+
+## Drawn Portion
+
+### Margin
+The margin is calculated on the drawn amount:
+
+$$
+\text{Margin (ZAR)} = \text{Drawn Amount} \times \frac{\text{Margin (bps)}}{10,000}
+$$
+
+### Total Cost Components
+The total cost consists of three main components:
+
+1. **Funding Cost**
+
+$$
+\text{Funding (ZAR)} = \text{Drawn Amount} \times \frac{\text{Funding (bps)}}{10,000}
+$$
+
+2. **Credit Cost**
+
+$$
+\text{Credit (ZAR)} = \text{Drawn Amount} \times \frac{\text{Credit (bps)}}{10,000}
+$$
+
+3. **Capital Cost**
+
+$$
+\text{Capital (ZAR)} = \text{Drawn Amount} \times \frac{\text{Capital (bps)}}{10,000}
+$$
+
+### Net Spread (Drawn)
+The net spread for the drawn portion is:
+
+$$
+\text{Net Spread (ZAR)} = \text{Margin} + \text{Total Cost}
+$$
+
+$$
+\text{Net Spread (bps)} = (\text{Margin bps} + \text{Total Cost bps}) \times \text{Drawn \%}
+$$
+
+## Undrawn Portion (Commitment Fee)
+
+### Commitment Fee
+
+$$
+\text{Fee (ZAR)} = \text{Undrawn Amount} \times \frac{\text{Commitment Fee (bps)}}{10,000}
+$$
+
+### Associated Costs
+Similar to the drawn portion, there are three cost components:
+
+1. **Funding Cost**
+
+$$
+\text{Funding (ZAR)} = \text{Undrawn Amount} \times \frac{\text{Commitment Fee Funding (bps)}}{10,000}
+$$
+
+2. **Credit Cost**
+
+$$
+\text{Credit (ZAR)} = \text{Undrawn Amount} \times \frac{\text{Commitment Fee Credit (bps)}}{10,000}
+$$
+
+3. **Capital Cost**
+
+$$
+\text{Capital (ZAR)} = \text{Undrawn Amount} \times \frac{\text{Commitment Fee Capital (bps)}}{10,000}
+$$
+
+## Blended View
+The blended view combines both drawn and undrawn portions:
+
+### Net Revenue
+
+$$
+\text{Net Revenue (ZAR)} = \text{Margin} + \text{Funding} + \text{CLN} + \text{Credit} + \text{Capital}
+$$
+
+Where each component combines both drawn and undrawn portions.
+
+### Return on Capital (ROC)
+ROC is calculated as:
+
+$$
+\text{ROC (bps)} = \frac{\text{Margin} + \text{Funding} + \text{CLN} + \text{Credit}}{-\text{Capital}} \times \text{Capital Cost}
+$$
+
+This measures the return generated relative to the capital employed.
+
+## Additional Notes
+- All calculations use basis points (bps) where 100 bps = 1%
+- Negative values are shown in parentheses (e.g., (100))
+- The drawn percentage affects the weighting of drawn vs. undrawn calculations
+- Capital costs are typically negative as they represent a cost to the bank
+"""
+
+# Basis points to a fraction: one multiply instead of a divide per figure
+BPS_TO_FRAC = 1e-4
+
+# Column layout shared by the NO CLN and CLN tables
+ROW_COLUMNS = ["Item", "ZAR", "BPS"]
+
+# NO CLN table labels below the company header row
+NO_CLN_ITEMS = (
+    # (Drawn portion results)
+    "<b>Margin</b>", "<b>Total Cost</b>", "Funding", "Credit", "Capital", "<b>Net Spread</b>",
+    "",
+    # (Undrawn portion - Commitment)
+    "<b>Commitment Fee</b>", "Funding", "Credit Cost", "Capital Cost", "<b>Net Spread</b>",
+    "",
+    # (Blended View)
+    "<b>Blended View</b>", "  Margin", "  Funding", "  CLN Cost", "  Credit", "  Capital",
+    "<b>Net Revenue</b>", "<b>ROC (bps)</b>",
+    "",
+    # (Facility + Drawn/Undrawn)
+    "<b>Facility Amount</b>", "<b>Drawn</b>", "<b>Undrawn</b>",
+)
+
+# Every figure the drawn, commitment fee and blended sections report, for one
+# scenario (No CLN or CLN). Field order is fixed so two results subtract as arrays.
+ScenarioResult = collections.namedtuple("ScenarioResult", [
+    "margin_zar", "margin_bps", "total_cost_zar", "total_cost_bps", "funding_zar", "funding_bps",
+    "credit_zar", "credit_bps", "capital_zar", "capital_bps", "net_spread_zar", "net_spread_bps",
+    "comm_fee_zar", "comm_fee_bps", "comm_fee_funding_zar", "comm_fee_funding_bps",
+    "comm_fee_credit_zar", "comm_fee_credit_bps", "comm_fee_capital_zar", "comm_fee_capital_bps",
+    "net_comm_fee_zar", "net_comm_fee_bps", "blended_margin_zar", "blended_margin_bps",
+    "blended_funding_zar", "blended_funding_bps", "blended_credit_zar", "blended_credit_bps",
+    "blended_capital_zar", "blended_capital_bps", "blended_netrev_zar", "blended_netrev_bps",
+    "blended_cln_cost_zar", "blended_cln_cost_bps", "cln_cost_zar", "cln_cost_bps", "roc_bps",
+])
+
+# CLN table layout: (label, ZAR key, BPS key) into the CLN ScenarioResult plus
+# facility figures; None is a blank cell
+CLN_SCHEMA = (
+    ("<b>CLN Scenario</b>", None, None),
+    ("CLN Amount", "cln_amount", "cln_pct_str"),
+    ("<b>Margin</b>", "margin_zar", "margin_bps"),
+    ("<b>Total Cost</b>", "total_cost_zar", "total_cost_bps"),
+    ("Funding", "funding_zar", "funding_bps"),
+    ("Credit", "credit_zar", "credit_bps"),
+    ("Capital", "capital_zar", "capital_bps"),
+    ("<b>Net Spread</b>", "net_spread_zar", "net_spread_bps"),
+    ("", None, None),
+    ("<b>Commitment Fee</b>", "comm_fee_zar", "comm_fee_bps"),
+    ("Funding", "comm_fee_funding_zar", "comm_fee_funding_bps"),
+    ("Credit Cost", "comm_fee_credit_zar", "comm_fee_credit_bps"),
+    ("Capital Cost", "comm_fee_capital_zar", "comm_fee_capital_bps"),
+    ("<b>Net Spread</b>", "net_comm_fee_zar", "net_comm_fee_bps"),
+    ("", None, None),
+    ("<b>CLN Cost</b>", "cln_cost_zar", "cln_cost_bps"),
+    ("", None, None),
+    ("<b>Blended View</b>", None, None),
+    ("Margin", "blended_margin_zar", "blended_margin_bps"),
+    ("Funding", "blended_funding_zar", "blended_funding_bps"),
+    ("CLN Cost", "blended_cln_cost_zar", "blended_cln_cost_bps"),
+    ("Credit", "blended_credit_zar", "blended_credit_bps"),
+    ("Capital", "blended_capital_zar", "blended_capital_bps"),
+    ("<b>Net Revenue</b>", "blended_netrev_zar", "blended_netrev_bps"),
+    ("<b>ROC (bps)</b>", None, "roc_bps"),
+    ("", None, None),
+    ("<b>Facility Amount</b>", "rcf_limit", "facility_pct"),
+    ("<b>Drawn</b>", "drawn_amount", "drawn_pct_str"),
+    ("<b>Undrawn</b>", "undrawn_amount", "undrawn_pct_str"),
+)
+
+# Row classes for rcf-table bodies: bold first cell marks a section header,
+# an all-blank row is a spacer
+_SECTION_TR = '<tr class="section-header">'
+_EMPTY_TR = '<tr class="empty-row">'
+_DATA_TR = '<tr class="data-row">'
+
+
+# Bound format methods for the two number layouts (negatives in parentheses)
+_NEG_FMT = "({:,.2f})".format
+_POS_FMT = "{:,.2f}".format
+
+
+@st.cache_resource(show_spinner=False)
+def _page_styles(path):
     """
-    Splits the table HTML into lines, looks for any line containing <td><b>,
-    and replaces <tr> with an inline style for that row's background color.
+    The stylesheet wrapped in a <style> tag, built once per process. A shared
+    read-only string, so cache_resource skips cache_data's per-hit copy.
     """
-    lines = html_table.splitlines()
-    new_lines = []
-    for line in lines:
-        if "<td><b>" in line:
-            # Add style to the row
-            line = line.replace(
-                "<tr>",
-                f"<tr style='background-color: {highlight_color};'>",
-                1  # only replace first occurrence
-            )
-        new_lines.append(line)
-    return "\n".join(new_lines)
+    return f"<style>{pathlib.Path(path).read_text(encoding='utf-8')}</style>"
+
+
+def format_column(s):
+    """
+    Formats the numbers in a Series as '(x.xx)' when negative, 'x.xx' otherwise;
+    non-numeric cells are left untouched.
+    """
+    num = pd.to_numeric(s, errors="coerce")
+    neg = num < 0
+    # abs() before formatting so -0.0 prints as 0.00
+    magnitude = num.abs()
+    out = np.where(neg, magnitude.map(_NEG_FMT), magnitude.map(_POS_FMT))
+    return pd.Series(out, index=s.index).where(num.notna(), s)
+
+
+def _rcf_table(headers, rows):
+    """
+    Renders already-formatted cells as an rcf-table. Content is app-generated,
+    so cells go in unescaped (as to_html(escape=False) did).
+    """
+    head = "".join(f"<th>{h}</th>" for h in headers)
+    parts = [f'<table class="rcf-table"><thead><tr>{head}</tr></thead><tbody>']
+    for row in rows:
+        if str(row[0]).startswith("<b>"):
+            tr = _SECTION_TR
+        elif all(cell == "" for cell in row):
+            tr = _EMPTY_TR
+        else:
+            tr = _DATA_TR
+        parts.append(tr + "".join(f"<td>{cell}</td>" for cell in row) + "</tr>")
+    parts.append("</tbody></table>")
+    return "".join(parts)
+
+
+def _formatted_rows(rows):
+    """
+    Item/ZAR/BPS row tuples from a column dict, numbers formatted by
+    format_column so this table matches the DataFrame-built ones.
+    """
+    zar = format_column(pd.Series(rows["ZAR"], dtype=object))
+    bps = format_column(pd.Series(rows["BPS"], dtype=object))
+    return zip(rows["Item"], zar, bps)
+
+
+def rows_to_html(rows):
+    """
+    Renders an Item/ZAR/BPS column dict as an rcf-table; rows with a bold
+    Item become section headers.
+    """
+    return _rcf_table(ROW_COLUMNS, _formatted_rows(rows))
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def build_table_html(df):
+    """Formats a DataFrame as a styled HTML table (styles come from rcf.css)."""
+    # Format numeric columns
+    numeric_columns = [c for c in df.columns if any(x in c.lower() for x in ("zar", "bps", "differential"))]
+    df[numeric_columns] = df[numeric_columns].apply(format_column)
+
+    # Bold headers: replace underscores with spaces and format "bps" to "BPS"
+    headers = [f"<b>{col.replace('_', ' ').replace('bps', 'BPS')}</b>" for col in df.columns]
+
+    # Direct render; pandas' to_html formatter is far heavier for a dozen rows
+    return _rcf_table(headers, df.itertuples(index=False, name=None))
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def build_output_table(rows):
+    """Builds the NO CLN output table HTML."""
+    return rows_to_html(rows)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def output_csv_bytes(rows):
+    """The NO CLN CSV export, formatted like the table."""
+    return _csv_bytes(ROW_COLUMNS, _formatted_rows(rows))
+
+
+def _csv_bytes(header, rows):
+    """Writes a header and row iterables as UTF-8 CSV bytes (no DataFrame needed)."""
+    buf = io.StringIO()
+    w = csv.writer(buf, lineterminator="\n")
+    w.writerow(header)
+    w.writerows(rows)
+    return buf.getvalue().encode("utf-8")
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def rows_to_csv_bytes(rows_tuple, header=tuple(ROW_COLUMNS)):
+    """CSV export of row tuples (Item, ZAR, BPS by default), cached so reruns skip re-serialising."""
+    return _csv_bytes(header, rows_tuple)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def rows_to_df(rows_tuple, header=tuple(ROW_COLUMNS)):
+    """DataFrame of row tuples, cached so reruns and mode switches reuse it."""
+    # Every column mixes labels and numbers, so declare object up front rather
+    # than let pandas scan each cell only to land on object anyway
+    return pd.DataFrame(list(rows_tuple), columns=list(header), dtype=object)
+
+
+def render_section(title, rows_tuple, dl_label, file_name, header=tuple(ROW_COLUMNS)):
+    """One results table: subheader, full-width CSV download above it, then the table."""
+    st.subheader(title)
+    st.download_button(
+        label=dl_label,
+        # Built on click (and cached), not on every render
+        data=functools.partial(rows_to_csv_bytes, rows_tuple, header=header),
+        file_name=file_name,
+        mime='text/csv',
+        width="stretch"
+    )
+    display_table(rows_to_df(rows_tuple, header=header))
 
 
 def display_table(df):
     """Formats and displays a DataFrame as an HTML table with styling."""
-    # Format numeric columns
-    numeric_columns = [col for col in df.columns if any(x in col.lower() for x in ['zar', 'bps', 'differential'])]
-    for col in numeric_columns:
-        df[col] = df[col].apply(format_negatives)
-
-    # Format column headers: replace underscores with spaces and format "bps" to "BPS"
-    df.columns = [col.replace('_', ' ').replace('bps', 'BPS') for col in df.columns]
-    
-    # Make all headers bold
-    df.columns = [f"<b>{col}</b>" for col in df.columns]
-
-    custom_css = """
-    <style>
-    .rcf-table {
-        width: 100%;
-        border-collapse: collapse;
-        font-family: -apple-system, system-ui, BlinkMacSystemFont, "Segoe UI", Roboto;
-    }
+    # Rendered inline (no iframe) since the table is static HTML
+    st.markdown(build_table_html(df), unsafe_allow_html=True)
 
-    /* Column Headers */
-    .rcf-table thead th {
-        background-color: #4A5568;
-        color: white;
-        padding: 12px 16px;
-        text-align: left;
-        font-weight: 500;
-        border: 1px solid #2D3748;
-    }
 
-    /* All cells */
-    .rcf-table td {
-        padding: 8px 16px;
-        border: 1px solid #E2E8F0;
-    }
+def _roc_bps(num, denom, cap_cost):
+    """
+    num / denom * cap_cost, or zero where denom is zero (np.divide's where=
+    instead of a branch). Broadcasts, so the what-if grid shares it.
+    """
+    num, denom = np.broadcast_arrays(np.asarray(num, dtype=float), np.asarray(denom, dtype=float))
+    return np.divide(num, denom, out=np.zeros_like(num), where=denom != 0) * cap_cost
 
-    /* Section headers (blue background) */
-    .rcf-table tr.section-header {
-        background-color: #EBF8FF;
-    }
-    .rcf-table tr.section-header td {
-        color: #2C5282;
-        font-weight: 600;
-    }
 
-    /* Regular rows */
-    .rcf-table tr:not(.section-header) {
-        background-color: white;
-    }
+def _blended_view(drawn_bps, undrawn_bps, drawn_percentage, cap_cost, cln_bps=0.0):
+    """
+    Blended View bps from the (margin, funding, credit, capital) drawn and
+    undrawn rates. Returns (blended rates, net revenue bps, ROC bps); the rates
+    gain a leading component axis over drawn_percentage's shape.
+    """
+    blended = (np.multiply.outer(drawn_bps, drawn_percentage)
+               + np.multiply.outer(undrawn_bps, 1 - drawn_percentage))
+    margin, funding, credit, capital = blended
+    net_revenue = margin + funding + cln_bps + credit + capital
+    roc = _roc_bps(margin + funding + cln_bps + credit, -capital, cap_cost)
+    return blended, net_revenue, roc
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cln_scenario(drawn_amount, undrawn_amount, cln_amount, cln_percentage,
+                  drawn_percentage, cap_cost,
+                  margin_bps, funding_bps, credit_bps, capital_bps,
+                  commitment_fee_bps, commitment_fee_funding_bps,
+                  commitment_fee_credit_bps, commitment_fee_capital_bps,
+                  cln_cost_bps):
+    """
+    CLN scenario figures (drawn, commitment fee and blended), cached on the
+    scalar inputs. Returns a ScenarioResult.
+    """
+    # Credit and capital (drawn and undrawn) scale by (1 - cln_percentage);
+    # margin, fee and funding are the same as No CLN
+    retained = 1 - cln_percentage
+
+    # ZAR per basis point of the drawn and undrawn amounts
+    drawn_per_bp = drawn_amount * BPS_TO_FRAC
+    undrawn_per_bp = undrawn_amount * BPS_TO_FRAC
+
+    # Drawn: Margin, Funding, Credit, Capital in one vector op
+    cln_drawn_bps = np.array([margin_bps, funding_bps,
+                              credit_bps * retained, capital_bps * retained])
+    cln_drawn_zar = drawn_per_bp * cln_drawn_bps
+    cln_margin_bps, cln_funding_bps, cln_credit_bps, cln_capital_bps = cln_drawn_bps
+    cln_margin_zar, cln_funding_zar, cln_credit_zar, cln_capital_zar = cln_drawn_zar
+
+    # First calculate CLN specific costs
+    cln_specific_cost_zar = cln_amount * cln_cost_bps * BPS_TO_FRAC  # G17
+
+    # Calculate CLN Total Cost
+    cln_total_cost_bps = cln_funding_bps + cln_credit_bps + cln_capital_bps
+    cln_total_cost_zar = drawn_per_bp * cln_total_cost_bps
+
+    # Calculate CLN Net Spread
+    cln_net_spread_zar = cln_margin_zar + cln_total_cost_zar
+    cln_net_spread_bps = cln_margin_bps + cln_total_cost_bps
+
+    # Commitment Fee: Fee, Funding, Credit, Capital in one vector op
+    cln_undrawn_bps = np.array([commitment_fee_bps, commitment_fee_funding_bps,
+                                commitment_fee_credit_bps * retained,
+                                commitment_fee_capital_bps * retained])
+    cln_undrawn_zar = undrawn_per_bp * cln_undrawn_bps
+    (cln_commitment_fee_bps, cln_comm_fee_funding_bps,
+     cln_commit_fee_credit_bps, cln_commit_fee_capital_bps) = cln_undrawn_bps
+    (cln_commitment_fee_zar, cln_comm_fee_funding_zar,
+     cln_commit_fee_credit_zar, cln_commit_fee_capital_zar) = cln_undrawn_zar
+
+    # Calculate Net Spread BPS and ZAR for Commitment Fees
+    cln_net_commit_fee_bps = cln_undrawn_bps.sum()
+    cln_net_commit_fee_zar = undrawn_per_bp * cln_net_commit_fee_bps
+
+    # Blended View: drawn + undrawn, weighted by drawn %
+    (cln_blended_margin_zar, cln_blended_funding_zar,
+     cln_blended_credit_zar, cln_blended_capital_zar) = cln_drawn_zar + cln_undrawn_zar
+
+    # CLN Cost for Blended View
+    blended_cln_cost_zar = cln_specific_cost_zar  # G22 = G17
+    blended_cln_cost_bps = cln_cost_bps * cln_percentage  # H22 = H17 * CLN%
+
+    # Blended rates, net revenue and ROC (shared with the No CLN view and what-if grid)
+    cln_blended_bps, cln_blended_netrev_bps, cln_roc_bps = _blended_view(
+        cln_drawn_bps, cln_undrawn_bps, drawn_percentage, cap_cost, blended_cln_cost_bps)
+    (cln_blended_margin_bps, cln_blended_funding_bps,
+     cln_blended_credit_bps, cln_blended_capital_bps) = cln_blended_bps
+
+    # Now calculate net revenue
+    cln_blended_netrev_zar = (
+            cln_blended_margin_zar  # Margin (positive)
+            + cln_blended_funding_zar  # Funding (negative)
+            + blended_cln_cost_zar  # CLN Cost (negative)
+            + cln_blended_credit_zar  # Credit (negative)
+            + cln_blended_capital_zar  # Capital (negative)
+    )
+
+    return ScenarioResult(
+        margin_zar=cln_margin_zar,
+        margin_bps=cln_margin_bps,
+        total_cost_zar=cln_total_cost_zar,
+        total_cost_bps=cln_total_cost_bps,
+        funding_zar=cln_funding_zar,
+        funding_bps=cln_funding_bps,
+        credit_zar=cln_credit_zar,
+        credit_bps=cln_credit_bps,
+        capital_zar=cln_capital_zar,
+        capital_bps=cln_capital_bps,
+        net_spread_zar=cln_net_spread_zar,
+        net_spread_bps=cln_net_spread_bps,
+        comm_fee_zar=cln_commitment_fee_zar,
+        comm_fee_bps=cln_commitment_fee_bps,
+        comm_fee_funding_zar=cln_comm_fee_funding_zar,
+        comm_fee_funding_bps=cln_comm_fee_funding_bps,
+        comm_fee_credit_zar=cln_commit_fee_credit_zar,
+        comm_fee_credit_bps=cln_commit_fee_credit_bps,
+        comm_fee_capital_zar=cln_commit_fee_capital_zar,
+        comm_fee_capital_bps=cln_commit_fee_capital_bps,
+        net_comm_fee_zar=cln_net_commit_fee_zar,
+        net_comm_fee_bps=cln_net_commit_fee_bps,
+        blended_margin_zar=cln_blended_margin_zar,
+        blended_margin_bps=cln_blended_margin_bps,
+        blended_funding_zar=cln_blended_funding_zar,
+        blended_funding_bps=cln_blended_funding_bps,
+        blended_credit_zar=cln_blended_credit_zar,
+        blended_credit_bps=cln_blended_credit_bps,
+        blended_capital_zar=cln_blended_capital_zar,
+        blended_capital_bps=cln_blended_capital_bps,
+        blended_netrev_zar=cln_blended_netrev_zar,
+        blended_netrev_bps=cln_blended_netrev_bps,
+        blended_cln_cost_zar=blended_cln_cost_zar,
+        blended_cln_cost_bps=blended_cln_cost_bps,
+        cln_cost_zar=cln_specific_cost_zar,
+        cln_cost_bps=cln_cost_bps,
+        roc_bps=cln_roc_bps,
+    )
 
-    /* Number columns - handle all numeric columns */
-    .rcf-table td:not(:first-child) {
-        text-align: right;
-        font-family: "SFMono-Regular", Consolas, "Liberation Mono", Menlo, monospace;
-        color: #2D3748;
-    }
 
-    /* Empty rows */
-    .rcf-table tr:has(td:empty) {
-        height: 8px;
-        background-color: white;
+@st.cache_data(show_spinner=False, max_entries=64)
+def compute_rcf(company_name, rcf_limit, drawn_percentage, cap_cost,
+                margin_bps, funding_bps, credit_bps, capital_bps,
+                commitment_fee_bps, commitment_fee_funding_bps,
+                commitment_fee_credit_bps, commitment_fee_capital_bps,
+                cln_amount, cln_cost_bps):
+    """
+    Runs every RCF calculation and builds the output rows, cached on the inputs.
+
+    Returns (rows, cln_rows, comparison_header, comparison_rows); rows is a
+    column dict, the CLN tables are row tuples. The CLN parts are None when
+    no CLN amount is given.
+    """
+    # ---------------------------
+    # CALCULATIONS
+    # ---------------------------
+    undrawn_percentage = 1 - drawn_percentage
+    drawn_amount = rcf_limit * drawn_percentage
+    undrawn_amount = rcf_limit * undrawn_percentage
+    drawn_per_bp = drawn_amount * BPS_TO_FRAC
+    undrawn_per_bp = undrawn_amount * BPS_TO_FRAC
+
+    # Percentage labels, formatted once and shared by every table
+    drawn_pct_str = f"{drawn_percentage * 100:.0f}%"
+    undrawn_pct_str = f"{undrawn_percentage * 100:.0f}%"
+
+    # 1) Margin and 2) Funding, Credit, Capital (Drawn) in one vector op
+    drawn_bps = np.array([margin_bps, funding_bps, credit_bps, capital_bps])
+    drawn_zar = drawn_per_bp * drawn_bps
+    margin_zar, funding_zar, credit_zar, capital_zar = drawn_zar
+
+    # 3) Total Cost (Drawn)
+    total_cost_bps = funding_bps + credit_bps + capital_bps
+    total_cost_zar = funding_zar + credit_zar + capital_zar
+
+    # 4) Net Spread (Drawn)
+    net_spread_zar = margin_zar + total_cost_zar
+    net_spread_bps = margin_bps + total_cost_bps
+
+    # 5) Commitment Fee and 6) Funding, Credit, Capital (Undrawn) in one vector op
+    undrawn_bps = np.array([commitment_fee_bps, commitment_fee_funding_bps,
+                            commitment_fee_credit_bps, commitment_fee_capital_bps])
+    undrawn_zar = undrawn_per_bp * undrawn_bps
+    commitment_fee_zar, comm_fee_funding_zar, comm_fee_credit_zar, comm_fee_capital_zar = undrawn_zar
+
+    # 7) Net Spread (Commitment Fees)
+    net_commit_bps = (
+            commitment_fee_bps
+            + commitment_fee_funding_bps
+            + commitment_fee_credit_bps
+            + commitment_fee_capital_bps
+    )
+    net_spread_commit_fees_zar = undrawn_per_bp * net_commit_bps
+    net_spread_commit_fees_bps = net_commit_bps
+
+    # ------------------------------------------------------------------
+    # BLENDED VIEW
+    # ------------------------------------------------------------------
+    # Margin, Funding, Credit, Capital: drawn + undrawn, weighted by drawn %
+    (blended_view_margin_zar, blended_view_funding_zar,
+     blended_view_credit_zar, blended_view_capital_zar) = drawn_zar + undrawn_zar
+
+    # (CLN)
+    blended_view_cln_zar = 0.0
+    blended_view_cln_bps = 0.0
+
+    # Blended rates, Net Revenue (bps) and ROC (zero when there is no capital to return on)
+    blended_bps, blended_view_net_revenue_bps, blended_view_roc_bps = _blended_view(
+        drawn_bps, undrawn_bps, drawn_percentage, cap_cost, blended_view_cln_bps)
+    (blended_view_margin_bps, blended_view_funding_bps,
+     blended_view_credit_bps, blended_view_capital_bps) = blended_bps
+
+    # Net Revenue
+    blended_view_net_revenue_zar = (
+            blended_view_margin_zar
+            + blended_view_funding_zar
+            + blended_view_cln_zar
+            + blended_view_credit_zar
+            + blended_view_capital_zar
+    )
+
+    # ------------------------------------------------------------------
+    # BUILD THE OUTPUT TABLE
+    # ------------------------------------------------------------------
+    # Built column-wise (Item / ZAR / BPS) so pandas takes the columns as-is
+    items = (f"<b>{company_name}</b>",) + NO_CLN_ITEMS
+    zar_vals = (
+        "",
+        margin_zar, total_cost_zar, funding_zar, credit_zar, capital_zar, net_spread_zar,
+        "",
+        commitment_fee_zar, comm_fee_funding_zar, comm_fee_credit_zar, comm_fee_capital_zar,
+        net_spread_commit_fees_zar,
+        "",
+        "", blended_view_margin_zar, blended_view_funding_zar, blended_view_cln_zar,
+        blended_view_credit_zar, blended_view_capital_zar,
+        blended_view_net_revenue_zar, "",
+        "",
+        rcf_limit, drawn_amount, undrawn_amount,
+    )
+    bps_vals = (
+        "",
+        margin_bps, total_cost_bps, funding_bps, credit_bps, capital_bps, net_spread_bps,
+        "",
+        commitment_fee_bps, commitment_fee_funding_bps, commitment_fee_credit_bps,
+        commitment_fee_capital_bps, net_spread_commit_fees_bps,
+        "",
+        "", blended_view_margin_bps, blended_view_funding_bps, blended_view_cln_bps,
+        blended_view_credit_bps, blended_view_capital_bps,
+        blended_view_net_revenue_bps, blended_view_roc_bps,
+        "",
+        "100%", drawn_pct_str, undrawn_pct_str,
+    )
+    rows = {"Item": items, "ZAR": zar_vals, "BPS": bps_vals}
+
+    # Capped at the limit first, so a zero limit never reaches the division below
+    cln_amount = min(cln_amount, rcf_limit)
+    if cln_amount <= 0:
+        return rows, None, None, None
+
+    # ------------------------------------------------------------------
+    # CLN SCENARIO
+    # ------------------------------------------------------------------
+    cln_percentage = cln_amount / rcf_limit
+    cln_pct_str = f"{cln_percentage * 100:.0f}%"
+
+    res = _cln_scenario(drawn_amount, undrawn_amount, cln_amount, cln_percentage,
+                        drawn_percentage, cap_cost,
+                        margin_bps, funding_bps, credit_bps, capital_bps,
+                        commitment_fee_bps, commitment_fee_funding_bps,
+                        commitment_fee_credit_bps, commitment_fee_capital_bps,
+                        cln_cost_bps)
+
+    # CLN rows, laid out by CLN_SCHEMA
+    vals = {
+        **res._asdict(),
+        "cln_amount": cln_amount, "cln_pct_str": cln_pct_str,
+        "rcf_limit": rcf_limit, "facility_pct": "100%",
+        "drawn_amount": drawn_amount, "drawn_pct_str": drawn_pct_str,
+        "undrawn_amount": undrawn_amount, "undrawn_pct_str": undrawn_pct_str,
     }
-    </style>
+    cln_rows = [(lbl, "" if z is None else vals[z], "" if b is None else vals[b])
+                for lbl, z, b in CLN_SCHEMA]
+
+    # No CLN figures in the same layout, so CLN - No CLN is one array subtract
+    no_cln = ScenarioResult(
+        margin_zar=margin_zar, margin_bps=margin_bps,
+        total_cost_zar=total_cost_zar, total_cost_bps=total_cost_bps,
+        funding_zar=funding_zar, funding_bps=funding_bps,
+        credit_zar=credit_zar, credit_bps=credit_bps,
+        capital_zar=capital_zar, capital_bps=capital_bps,
+        net_spread_zar=net_spread_zar, net_spread_bps=net_spread_bps,
+        comm_fee_zar=commitment_fee_zar, comm_fee_bps=commitment_fee_bps,
+        comm_fee_funding_zar=comm_fee_funding_zar, comm_fee_funding_bps=commitment_fee_funding_bps,
+        comm_fee_credit_zar=comm_fee_credit_zar, comm_fee_credit_bps=commitment_fee_credit_bps,
+        comm_fee_capital_zar=comm_fee_capital_zar, comm_fee_capital_bps=commitment_fee_capital_bps,
+        net_comm_fee_zar=net_spread_commit_fees_zar, net_comm_fee_bps=net_spread_commit_fees_bps,
+        blended_margin_zar=blended_view_margin_zar, blended_margin_bps=blended_view_margin_bps,
+        blended_funding_zar=blended_view_funding_zar, blended_funding_bps=blended_view_funding_bps,
+        blended_credit_zar=blended_view_credit_zar, blended_credit_bps=blended_view_credit_bps,
+        blended_capital_zar=blended_view_capital_zar, blended_capital_bps=blended_view_capital_bps,
+        blended_netrev_zar=blended_view_net_revenue_zar, blended_netrev_bps=blended_view_net_revenue_bps,
+        blended_cln_cost_zar=blended_view_cln_zar, blended_cln_cost_bps=blended_view_cln_bps,
+        cln_cost_zar=0.0, cln_cost_bps=0.0,
+        roc_bps=blended_view_roc_bps,
+    )
+    diff = ScenarioResult._make(np.subtract(res, no_cln))
+
+    # CLN column headers, formatted once for every comparison row
+    comparison_header = ("Item", "NO CLN_ZAR", "NO CLN_bps",
+                         f"R{cln_amount:,.0f} CLN_ZAR", f"R{cln_amount:,.0f} CLN_bps",
+                         "Differential", "bps")
+
+    def field_row(label, field):
+        # No CLN, CLN and differential ZAR/bps for one ScenarioResult field
+        zar, bps = f"{field}_zar", f"{field}_bps"
+        return (label, getattr(no_cln, zar), getattr(no_cln, bps),
+                getattr(res, zar), getattr(res, bps), getattr(diff, zar), getattr(diff, bps))
+
+    empty = ("",) * 7
+
+    # ROC (a warning sign instead of figures when the CLN ROC is off the scale)
+    roc_off_scale = res.roc_bps > 999
+    roc_str = "⚠" if roc_off_scale else f"{res.roc_bps:.2f}%"
+    roc_diff_str = "⚠" if roc_off_scale else f"{diff.roc_bps:.2f}%"
+
+    comparison_rows = (
+        (f"{company_name}", "", "", "", "", "", ""),
+        # Drawn portion
+        field_row("Margin", "margin"),
+        field_row("Total Cost", "total_cost"),
+        field_row("Funding", "funding"),
+        field_row("Credit", "credit"),
+        field_row("Capital", "capital"),
+        field_row("Net Spread", "net_spread"),
+        empty,
+        # Commitment Fee section
+        field_row("Commitment fee", "comm_fee"),
+        field_row("Funding", "comm_fee_funding"),
+        field_row("Credit Cost", "comm_fee_credit"),
+        field_row("Capital Cost", "comm_fee_capital"),
+        field_row("Net Spread", "net_comm_fee"),
+        empty,
+        # CLN Cost
+        ("CLN Cost", "-", "-", res.cln_cost_zar, res.cln_cost_bps, res.cln_cost_zar, res.cln_cost_bps),
+        empty,
+        # Blended View
+        ("Blended View", "", "", "", "", "", ""),
+        field_row("Margin", "blended_margin"),
+        field_row("Funding", "blended_funding"),
+        ("CLN Cost", "-", "-", res.blended_cln_cost_zar, res.blended_cln_cost_bps,
+         res.blended_cln_cost_zar, res.blended_cln_cost_bps),
+        field_row("Credit", "blended_credit"),
+        field_row("Capital", "blended_capital"),
+        field_row("Net Revenue", "blended_netrev"),
+        empty,
+        ("ROC", "", f"{no_cln.roc_bps:.2f}%", "", roc_str, "", roc_diff_str),
+        empty,
+        # Facility Information
+        ("Facility Amount", rcf_limit, "100%", rcf_limit, "100%", "", ""),
+        ("Drawn", drawn_amount, drawn_pct_str, drawn_amount, drawn_pct_str, "", ""),
+        ("Undrawn", undrawn_amount, undrawn_pct_str, undrawn_amount, undrawn_pct_str, "", ""),
+        empty,
+        # CLN Note
+        ("CLN Note", "-", "0%", cln_amount, cln_pct_str, "", ""),
+    )
+
+    return rows, cln_rows, comparison_header, comparison_rows
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def compute_blended_grid(rcf_limit, drawn_percentages, cap_costs,
+                         margin_bps, funding_bps, credit_bps, capital_bps,
+                         commitment_fee_bps, commitment_fee_funding_bps,
+                         commitment_fee_credit_bps, commitment_fee_capital_bps):
+    """
+    No CLN blended Net Revenue and ROC for every (drawn %, capital cost) pair,
+    broadcast over the whole grid in one pass. Returns one row per scenario.
+    """
+    drawn = np.asarray(drawn_percentages, dtype=float)
+    cost = np.asarray(cap_costs, dtype=float)
+
+    drawn_bps = np.array([margin_bps, funding_bps, credit_bps, capital_bps])
+    undrawn_bps = np.array([commitment_fee_bps, commitment_fee_funding_bps,
+                            commitment_fee_credit_bps, commitment_fee_capital_bps])
+    # Same formulas as the tables; drawn % down the rows, capital cost across
+    _, net_revenue_bps, roc_bps = _blended_view(drawn_bps, undrawn_bps, drawn[:, None], cost)
+    # The ZAR figure is the same bps on the full limit
+    net_revenue_zar = rcf_limit * BPS_TO_FRAC * net_revenue_bps
+
+    shape = roc_bps.shape
+    return pd.DataFrame({
+        "Drawn %": np.repeat(drawn * 100, len(cost)),
+        "Capital Cost": np.tile(cost, len(drawn)),
+        "Net Revenue (ZAR)": np.broadcast_to(net_revenue_zar, shape).ravel(),
+        "Net Revenue (bps)": np.broadcast_to(net_revenue_bps, shape).ravel(),
+        "ROC (bps)": roc_bps.ravel(),
+    })
+
+
+def _parse_values(text):
+    """Comma-separated finite numbers from a text input; raises ValueError on bad entries."""
+    values = [float(x) for x in text.split(",") if x.strip()]
+    # float() accepts 'nan' and 'inf', which would fill the grid with NaN
+    if not all(math.isfinite(v) for v in values):
+        raise ValueError("non-finite scenario value")
+    return values
+
+
+@st.fragment
+def render_what_if(rcf_limit, bps_inputs):
+    """
+    What-if grid over drawn percentage and capital cost for the current No CLN
+    inputs. A fragment, so editing the lists only reruns this section.
+    """
+    with st.expander("🔀 What-if Scenarios (No CLN, Blended View)"):
+        st.markdown("""
+            <small>Enter comma-separated values; every combination is calculated at once.</small>
+        """, unsafe_allow_html=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            drawn_text = st.text_input("Drawn Percentages (0.00 - 1.00)", value="0.25, 0.35, 0.50, 0.75, 1.00")
+        with col2:
+            cost_text = st.text_input("Capital Costs", value="10, 12, 14")
+
+        try:
+            drawn_percentages = _parse_values(drawn_text)
+            cap_costs = _parse_values(cost_text)
+        except ValueError:
+            st.error("Scenario values must be finite numbers separated by commas.")
+            return
+        if not drawn_percentages or not cap_costs:
+            return
+        if not all(0.0 <= d <= 1.0 for d in drawn_percentages):
+            st.error("Drawn percentages must be between 0.00 and 1.00.")
+            return
+
+        grid = compute_blended_grid(rcf_limit, tuple(drawn_percentages), tuple(cap_costs), *bps_inputs)
+        st.dataframe(
+            grid,
+            hide_index=True,
+            width="stretch",
+            column_config={
+                "Drawn %": st.column_config.NumberColumn(format="%.0f%%"),
+                # Accounting format matches the tables: negatives in parentheses
+                "Net Revenue (ZAR)": st.column_config.NumberColumn(format="accounting"),
+                "Net Revenue (bps)": st.column_config.NumberColumn(format="accounting"),
+                "ROC (bps)": st.column_config.NumberColumn(format="accounting"),
+            },
+        )
+
+
+@st.fragment
+def render_results(compare_mode):
+    """
+    Renders the results stored by the last Calculate click. Runs as a fragment,
+    so the download buttons inside it only rerun this section.
     """
+    data = st.session_state.table_data
+    if data is None:
+        return
 
-    # Convert to HTML
-    html_table = df.to_html(index=False, border=0, escape=False)
+    company_name = data["company_name"]
+    rows = data["rows"]
+    cln_rows = data["cln_rows"]
+    comparison_header = data["comparison_header"]
+    comparison_rows = data["comparison_rows"]
 
-    # Replace default class and add section header styling
-    html_table = html_table.replace('class="dataframe"', 'class="rcf-table"')
-    html_table = html_table.replace('<tr>', '<tr class="data-row">')
-    html_table = html_table.replace('<tr class="data-row"><td><b>', '<tr class="section-header"><td><b>')
+    # Add explanatory text above the table
+    st.markdown("""
+        ### Results Explanation
+        - **Bold rows** indicate major sections and totals
+        - Negative values are shown in parentheses
+        - The Blended View combines both drawn and undrawn portions
+    """)
+
+    st.subheader("NO CLN Output Table")
+
+    # Build the table HTML (cached per set of rows)
+    final_html = build_output_table(rows)
+
+    # Add CSV download button at the top; the CSV is only built on click
+    st.download_button(
+        label="📊 Download CSV",
+        data=functools.partial(output_csv_bytes, rows),
+        file_name=f"{company_name}_rcf_cln_calculation.csv",
+        mime='text/csv'
+    )
 
-    # Combine CSS and table
-    final_html = custom_css + html_table
+    # Display table inline; only the image download button needs an iframe (for JS)
+    st.markdown(final_html, unsafe_allow_html=True)
+    components.html(_SCREENSHOT_HTML, height=70)
 
-    # Display with adjusted height
-    components.html(final_html, height=1000, scrolling=True)
+    # Add context after the table and buttons
+    st.markdown("""
+        <small>
+        ℹ️ **Note:** The table above shows:
+        - Drawn portion calculations (margin and costs)
+        - Undrawn portion calculations (commitment fees)
+        - Blended view combining both portions
+        - Return on Capital (ROC) metrics
+        </small>
+    """, unsafe_allow_html=True)
 
+    # CLN results (if enabled)
+    if cln_rows is not None:
+        # Hashable cache key for the CLN table and its CSV export
+        cln_key = tuple(cln_rows)
+
+        # Then use the display mode check
+        if compare_mode == "Show CLN Table Only":
+            render_section("CLN Scenario Results", cln_key,
+                           "📊 Download CSV", f"{company_name}_cln_scenario.csv")
+
+            # Add image download button BELOW the table
+            components.html(_TABLE_IMAGE_BUTTON, height=70)
+        elif compare_mode == "Compare: No CLN vs. CLN":
+            col1, col2 = st.columns(2)
+            with col1:
+                render_section("No CLN Scenario", tuple(zip(rows["Item"], rows["ZAR"], rows["BPS"])),
+                               "📊 Download No CLN CSV", f"{company_name}_no_cln.csv")
+            with col2:
+                render_section("CLN Scenario", cln_key,
+                               "📊 Download CLN CSV", f"{company_name}_cln.csv")
+
+            # Add image download button for both tables
+            components.html(_TABLES_IMAGE_BUTTON, height=70)
+        elif compare_mode == "Single Comparison Table":
+            render_section("CLN Comparison Analysis", comparison_rows,
+                           "📊 Download CSV", f"{company_name}_cln_comparison.csv",
+                           header=comparison_header)
+
+            # Add image download button BELOW the table with fixed JavaScript
+            components.html(_TABLE_IMAGE_BUTTON, height=70)
 
 def main():
     # At the start of main(), initialize session state
@@ -123,171 +970,8 @@ def main():
     )
 
     # Custom CSS for better styling with dark mode support
-    st.markdown("""
-        <style>
-        /* Main container styling */
-        .main {
-            padding: 2rem;
-        }
-        
-        /* Headers styling - dark mode friendly */
-        [data-testid="stAppViewContainer"] {
-            color: var(--text-color);
-        }
-        
-        h1 {
-            color: #66B2FF !important;
-            padding-bottom: 1rem;
-            border-bottom: 2px solid rgba(255, 255, 255, 0.1);
-            margin-bottom: 2rem;
-        }
-        
-        h2 {
-            color: #7FDBCA !important;
-            margin-top: 2rem;
-            margin-bottom: 1rem;
-        }
-        
-        h3 {
-            color: #B2CCD6 !important;
-            margin-top: 1.5rem;
-        }
-        
-        /* Sidebar styling */
-        .css-1d391kg {
-            padding: 2rem 1rem;
-        }
-        
-        /* Input fields styling */
-        .stNumberInput {
-            background-color: rgba(255, 255, 255, 0.05);
-            border-radius: 5px;
-            padding: 0.5rem;
-        }
-        
-        /* Button styling */
-        .stButton>button {
-            background-color: #66B2FF;
-            color: white;
-            border: none;
-            border-radius: 5px;
-            padding: 0.5rem 1rem;
-            transition: all 0.3s ease;
-        }
-        
-        .stButton>button:hover {
-            background-color: #3399FF;
-            box-shadow: 0 2px 4px rgba(102, 178, 255, 0.2);
-        }
-        
-        /* Tab styling */
-        .stTabs [data-baseweb="tab-list"] {
-            gap: 2rem;
-        }
-        
-        .stTabs [data-baseweb="tab"] {
-            height: 3rem;
-            white-space: pre-wrap;
-            background-color: rgba(255, 255, 255, 0.05);
-            border-radius: 4px 4px 0 0;
-            gap: 1rem;
-            padding: 1rem 2rem;
-            color: #B2CCD6;
-        }
-        
-        .stTabs [aria-selected="true"] {
-            background-color: #66B2FF !important;
-            color: white !important;
-        }
-        
-        /* Expander styling */
-        .streamlit-expanderHeader {
-            background-color: rgba(255, 255, 255, 0.05);
-            border-radius: 4px;
-        }
-        
-        /* LaTeX equation styling */
-        .katex {
-            font-size: 1.1em;
-            padding: 1rem;
-            background-color: rgba(255, 255, 255, 0.05);
-            border-radius: 4px;
-            margin: 0.5rem 0;
-            display: block;
-            color: #E6F3FF;
-        }
-        
-        /* Table styling enhancements */
-        .mystyle {
-            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.2);
-            transition: all 0.3s ease;
-            background-color: rgba(255, 255, 255, 0.05);
-        }
-        
-        .mystyle th {
-            background-color: rgba(102, 178, 255, 0.1);
-            color: #E6F3FF;
-        }
-        
-        .mystyle td {
-            color: #E6F3FF;
-        }
-        
-        .mystyle tr:nth-child(even) {
-            background-color: rgba(255, 255, 255, 0.02);
-        }
-        
-        .mystyle tr:hover {
-            background-color: rgba(102, 178, 255, 0.1);
-        }
-        
-        /* Additional spacing and formatting */
-        .stMarkdown {
-            line-height: 1.6;
-            color: #E6F3FF;
-        }
-        
-        /* Success/info message styling */
-        .stSuccess, .stInfo {
-            padding: 1rem;
-            border-radius: 4px;
-            margin: 1rem 0;
-            background-color: rgba(255, 255, 255, 0.05);
-        }
-        
-        /* Divider styling */
-        hr {
-            border-color: rgba(255, 255, 255, 0.1) !important;
-        }
-        
-        /* Text color for better readability */
-        p, li {
-            color: #E6F3FF !important;
-        }
-
-        /* Make the entire row highlighted when it contains bold text */
-        .mystyle tr:has(td:first-child b) {
-            background-color: #EBF8FF;  /* Light blue background */
-            font-weight: bold;  /* Make all text in highlighted rows bold */
-        }
-
-        /* Keep the non-first cells in highlighted rows bold but original color */
-        .mystyle tr:has(td:first-child b) td:not(:first-child) {
-            color: #000000;  /* Keep the number color black */
-            font-weight: bold;
-        }
-
-        /* Keep the first cell (with b tag) styled as before */
-        .mystyle tr td:first-child b {
-            display: block;
-            width: 100%;
-            background-color: #90CDF4;
-            padding: 8px;
-            margin: -8px;
-            color: #2A4365;
-        }
-        </style>
-    """, unsafe_allow_html=True)
+    # (style-only st.html skips markdown parsing and takes no layout space)
+    st.html(_page_styles(str(_STYLES_PATH)))
 
     # Create tabs with better styling
     tab_calculator, tab_explanation = st.tabs(["📊 Calculator", "📖 Explanation"])
@@ -310,131 +994,152 @@ def main():
         # -----------------
         st.sidebar.header("User Inputs")
 
-        with st.sidebar.expander("General Inputs", expanded=True):
-            st.markdown("""
-                <small>These are the primary inputs that define the facility structure.</small>
-            """, unsafe_allow_html=True)
+        # Inputs are batched in a form: editing them does not rerun the app until Calculate
+        with st.sidebar.form("inputs", border=False):
+            with st.expander("General Inputs", expanded=True):
+                st.markdown("""
+                    <small>These are the primary inputs that define the facility structure.</small>
+                """, unsafe_allow_html=True)
             
-            company_name = st.text_input(
-                "Company Name", 
-                value="Burger's Burgers",
-                help="Enter the name of the company or facility"
-            )
+                company_name = st.text_input(
+                    "Company Name", 
+                    value="Burger's Burgers",
+                    help="Enter the name of the company or facility"
+                )
 
-            rcf_limit = st.number_input(
-                "RCF Limit (ZAR)",
-                min_value=0.0, value=2_000_000_000.0, step=50_000.0,
-                help="The total facility limit in South African Rand (ZAR)"
-            )
+                rcf_limit = st.number_input(
+                    "RCF Limit (ZAR)",
+                    min_value=0.0, value=2_000_000_000.0, step=50_000.0,
+                    help="The total facility limit in South African Rand (ZAR)"
+                )
 
-            drawn_percentage = st.number_input(
-                "Drawn Percentage (0.00 - 1.00)",
-                min_value=0.0, max_value=1.0,
-                value=0.35, step=0.05,
-                help="The portion of the facility that is currently drawn down (e.g., 0.35 = 35%)"
-            )
+                drawn_percentage = st.number_input(
+                    "Drawn Percentage (0.00 - 1.00)",
+                    min_value=0.0, max_value=1.0,
+                    value=0.35, step=0.05,
+                    help="The portion of the facility that is currently drawn down (e.g., 0.35 = 35%)"
+                )
 
-            cap_cost = st.number_input(
-                "Capital Cost (for ROC calculation)",
-                min_value=0.0, value=12.0, step=1.0,
-                help="The cost of capital used in Return on Capital calculations"
-            )
+                cap_cost = st.number_input(
+                    "Capital Cost (for ROC calculation)",
+                    min_value=0.0, value=12.0, step=1.0,
+                    help="The cost of capital used in Return on Capital calculations"
+                )
 
-        with st.sidebar.expander("Total Cost (Drawn Portion) Inputs", expanded=True):
-            st.markdown("""
-                <small>These inputs determine the costs associated with the drawn portion of the facility.</small>
-            """, unsafe_allow_html=True)
+            with st.expander("Total Cost (Drawn Portion) Inputs", expanded=True):
+                st.markdown("""
+                    <small>These inputs determine the costs associated with the drawn portion of the facility.</small>
+                """, unsafe_allow_html=True)
             
-            margin_bps = st.number_input(
-                "Margin (bps)", 
-                value=250.0,
-                help="The margin charged on the drawn portion in basis points"
-            )
+                margin_bps = st.number_input(
+                    "Margin (bps)", 
+                    value=250.0,
+                    help="The margin charged on the drawn portion in basis points"
+                )
             
-            funding_bps = st.number_input(
-                "Funding (bps)", 
-                value=-114.0,
-                help="The funding cost in basis points (typically negative)"
-            )
+                funding_bps = st.number_input(
+                    "Funding (bps)", 
+                    value=-114.0,
+                    help="The funding cost in basis points (typically negative)"
+                )
             
-            credit_bps = st.number_input(
-                "Credit (bps)", 
-                value=-29.0,
-                help="The credit cost in basis points (typically negative)"
-            )
+                credit_bps = st.number_input(
+                    "Credit (bps)", 
+                    value=-29.0,
+                    help="The credit cost in basis points (typically negative)"
+                )
             
-            capital_bps = st.number_input(
-                "Capital (bps)", 
-                value=-115.0,
-                help="The capital cost in basis points (typically negative)"
-            )
+                capital_bps = st.number_input(
+                    "Capital (bps)", 
+                    value=-115.0,
+                    help="The capital cost in basis points (typically negative)"
+                )
 
-        with st.sidebar.expander("Commitment Fee (Undrawn) Inputs", expanded=True):
-            st.markdown("""
-                <small>These inputs determine the costs associated with the undrawn portion of the facility.</small>
-            """, unsafe_allow_html=True)
+            with st.expander("Commitment Fee (Undrawn) Inputs", expanded=True):
+                st.markdown("""
+                    <small>These inputs determine the costs associated with the undrawn portion of the facility.</small>
+                """, unsafe_allow_html=True)
             
-            commitment_fee_bps = st.number_input(
-                "Commitment Fee (bps)", 
-                value=75.0,
-                help="The fee charged on the undrawn portion in basis points"
-            )
+                commitment_fee_bps = st.number_input(
+                    "Commitment Fee (bps)", 
+                    value=75.0,
+                    help="The fee charged on the undrawn portion in basis points"
+                )
             
-            commitment_fee_funding_bps = st.number_input(
-                "Commitment Fee Funding (bps)", 
-                value=-13.0,
-                help="The funding cost for the undrawn portion in basis points"
-            )
+                commitment_fee_funding_bps = st.number_input(
+                    "Commitment Fee Funding (bps)", 
+                    value=-13.0,
+                    help="The funding cost for the undrawn portion in basis points"
+                )
             
-            commitment_fee_credit_bps = st.number_input(
-                "Commitment Fee Credit (bps)", 
-                value=-12.0,
-                help="The credit cost for the undrawn portion in basis points"
-            )
+                commitment_fee_credit_bps = st.number_input(
+                    "Commitment Fee Credit (bps)", 
+                    value=-12.0,
+                    help="The credit cost for the undrawn portion in basis points"
+                )
             
-            commitment_fee_capital_bps = st.number_input(
-                "Commitment Fee Capital (bps)", 
-                value=-50.0,
-                help="The capital cost for the undrawn portion in basis points"
-            )
+                commitment_fee_capital_bps = st.number_input(
+                    "Commitment Fee Capital (bps)", 
+                    value=-50.0,
+                    help="The capital cost for the undrawn portion in basis points"
+                )
 
-        # CLN Section
-        with st.sidebar.expander("CLN Inputs", expanded=True):
-            st.markdown("""
-                <small>Credit Linked Note (CLN) parameters for credit risk transfer.</small>
-            """, unsafe_allow_html=True)
+            # CLN Section
+            with st.expander("CLN Inputs", expanded=True):
+                st.markdown("""
+                    <small>Credit Linked Note (CLN) parameters for credit risk transfer.</small>
+                """, unsafe_allow_html=True)
 
-            include_cln = st.checkbox(
-                "Include CLN Issuance?",
-                value=False,
-                help="Enable to include CLN calculations"
-            )
+                include_cln = st.checkbox(
+                    "Include CLN Issuance?",
+                    value=False,
+                    help="Enable to include CLN calculations"
+                )
 
-            if include_cln:
+                # Always shown: inside a form the checkbox only takes effect on submit.
+                # Fixed key and bounds (not derived from the last submitted limit), so
+                # changing the limit in the same submit keeps the typed amount
                 cln_amount = st.number_input(
                     "CLN Amount (ZAR)",
-                    min_value=0.0, max_value=rcf_limit,
-                    value=rcf_limit * 0.15,  # Default to 15% of RCF limit
+                    min_value=0.0,
+                    value=300_000_000.0,  # 15% of the default RCF limit
                     step=50_000.0,
-                    help="Amount of credit risk to transfer (cannot exceed RCF limit)"
+                    key="cln_amount",
+                    help="Amount of credit risk to transfer (cannot exceed RCF limit); used when CLN is included"
                 )
 
                 cln_cost_bps = st.number_input(
                     "CLN Cost (bps)",
                     min_value=-9999.0, max_value=9999.0,
                     value=-70.0,  # Changed from -50.0
-                    help="The cost of issuing the CLN (typically negative)"
+                    help="The cost of issuing the CLN (typically negative); used when CLN is included"
                 )
 
-                compare_mode = st.radio(
-                    "Output Display Mode",
-                    ("Show CLN Table Only", "Compare: No CLN vs. CLN", "Single Comparison Table"),
-                    help="Choose how to display the CLN scenario results"
-                )
+            # Calculate Button with description
+            calc_btn = st.form_submit_button(
+                "Calculate",
+                help="Click to calculate the RCF metrics based on the inputs provided"
+            )
+
+        if not include_cln:
+            cln_amount = 0.0
+            cln_cost_bps = 0.0
+        elif calc_btn and cln_amount > rcf_limit:
+            # compute_rcf clamps the notional; say so rather than do it silently
+            if rcf_limit > 0:
+                st.sidebar.warning(f"CLN Amount exceeds the RCF Limit; capped at {rcf_limit:,.2f} ZAR.")
             else:
-                cln_amount = 0.0
-                cln_cost_bps = 0.0
-                compare_mode = "Show CLN Table Only"
+                st.sidebar.warning("RCF Limit is zero, so the CLN scenario is skipped.")
+
+        # Display-only choice, outside the form so switching views needs no recalculation
+        if include_cln:
+            compare_mode = st.sidebar.radio(
+                "Output Display Mode",
+                ("Show CLN Table Only", "Compare: No CLN vs. CLN", "Single Comparison Table"),
+                help="Choose how to display the CLN scenario results"
+            )
+        else:
+            compare_mode = "Show CLN Table Only"
 
         # In the sidebar, after the CLN section and before the helpful notes:
         with st.sidebar.expander("⚙️ Settings"):
@@ -452,742 +1157,31 @@ def main():
             </small>
         """, unsafe_allow_html=True)
 
-        # Calculate Button with description
-        calc_btn = st.sidebar.button(
-            "Calculate",
-            help="Click to calculate the RCF metrics based on the inputs provided"
-        )
-
         if calc_btn:
             # Add a loading message
             with st.spinner('Calculating RCF metrics...'):
-                # ---------------------------
-                # CALCULATIONS
-                # ---------------------------
-                undrawn_percentage = 1 - drawn_percentage
-                drawn_amount = rcf_limit * drawn_percentage
-                undrawn_amount = rcf_limit * undrawn_percentage
-
-                # 1) Margin
-                margin_zar = drawn_amount * (margin_bps / 10_000)
-
-                # 2) Funding, Credit, Capital (Drawn)
-                funding_zar = drawn_amount * (funding_bps / 10_000)
-                credit_zar = drawn_amount * (credit_bps / 10_000)
-                capital_zar = drawn_amount * (capital_bps / 10_000)
-
-                # 3) Total Cost (Drawn)
-                total_cost_bps = funding_bps + credit_bps + capital_bps
-                total_cost_zar = funding_zar + credit_zar + capital_zar
-
-                # 4) Net Spread (Drawn)
-                net_spread_zar = margin_zar + total_cost_zar
-                net_spread_bps = margin_bps + total_cost_bps
-
-                # 5) Commitment Fee (Undrawn)
-                commitment_fee_zar = undrawn_amount * (commitment_fee_bps / 10_000)
-
-                # 6) Funding, Credit, Capital (Commitment Fee)
-                comm_fee_funding_zar = undrawn_amount * (commitment_fee_funding_bps / 10_000)
-                comm_fee_credit_zar = undrawn_amount * (commitment_fee_credit_bps / 10_000)
-                comm_fee_capital_zar = undrawn_amount * (commitment_fee_capital_bps / 10_000)
-
-                # 7) Net Spread (Commitment Fees)
-                net_commit_bps = (
-                        commitment_fee_bps
-                        + commitment_fee_funding_bps
-                        + commitment_fee_credit_bps
-                        + commitment_fee_capital_bps
-                )
-                net_spread_commit_fees_zar = undrawn_amount * (net_commit_bps / 10_000)
-                net_spread_commit_fees_bps = net_commit_bps
-
-                # ------------------------------------------------------------------
-                # BLENDED VIEW
-                # ------------------------------------------------------------------
-                # (Margin)
-                blended_view_margin_zar = margin_zar + commitment_fee_zar
-                blended_view_margin_bps = (margin_bps * drawn_percentage) + (commitment_fee_bps * undrawn_percentage)
-
-                # (Funding)
-                blended_view_funding_zar = funding_zar + comm_fee_funding_zar
-                blended_view_funding_bps = (funding_bps * drawn_percentage) + (
-                            commitment_fee_funding_bps * undrawn_percentage)
-
-                # (CLN)
-                blended_view_cln_zar = 0.0
-                blended_view_cln_bps = 0.0
-
-                # (Credit)
-                blended_view_credit_zar = credit_zar + comm_fee_credit_zar
-                blended_view_credit_bps = (credit_bps * drawn_percentage) + (
-                            commitment_fee_credit_bps * undrawn_percentage)
-
-                # (Capital)
-                blended_view_capital_zar = capital_zar + comm_fee_capital_zar
-                blended_view_capital_bps = (capital_bps * drawn_percentage) + (
-                            commitment_fee_capital_bps * undrawn_percentage)
-
-                # Net Revenue
-                blended_view_net_revenue_zar = (
-                        blended_view_margin_zar
-                        + blended_view_funding_zar
-                        + blended_view_cln_zar
-                        + blended_view_credit_zar
-                        + blended_view_capital_zar
+                rows, cln_rows, comparison_header, comparison_rows = compute_rcf(
+                    company_name, rcf_limit, drawn_percentage, cap_cost,
+                    margin_bps, funding_bps, credit_bps, capital_bps,
+                    commitment_fee_bps, commitment_fee_funding_bps,
+                    commitment_fee_credit_bps, commitment_fee_capital_bps,
+                    cln_amount, cln_cost_bps
                 )
-                blended_view_net_revenue_bps = (
-                        blended_view_margin_bps
-                        + blended_view_funding_bps
-                        + blended_view_cln_bps
-                        + blended_view_credit_bps
-                        + blended_view_capital_bps
-                )
-
-                # ROC
-                try:
-                    if blended_view_capital_bps == 0:
-                        blended_view_roc_bps = 0
-                    else:
-                        blended_view_roc_bps = (
-                                (blended_view_margin_bps
-                                 + blended_view_funding_bps
-                                 + blended_view_cln_bps
-                                 + blended_view_credit_bps)
-                                / (-blended_view_capital_bps)
-                                * cap_cost
-                        )
-                except ZeroDivisionError:
-                    blended_view_roc_bps = 0
-
-            # Add explanatory text above the table
-            st.markdown("""
-                ### Results Explanation
-                - **Bold rows** indicate major sections and totals
-                - Negative values are shown in parentheses
-                - The Blended View combines both drawn and undrawn portions
-            """)
-
-            # ------------------------------------------------------------------
-            # BUILD THE OUTPUT TABLE
-            # ------------------------------------------------------------------
-            rows = [
-                {"Item": f"<b>{company_name}</b>", "ZAR": "", "BPS": ""},
-                # (Drawn portion results)
-                {"Item": "<b>Margin</b>", "ZAR": margin_zar, "BPS": margin_bps},
-                {"Item": "<b>Total Cost</b>", "ZAR": total_cost_zar, "BPS": total_cost_bps},
-                {"Item": "Funding", "ZAR": funding_zar, "BPS": funding_bps},
-                {"Item": "Credit", "ZAR": credit_zar, "BPS": credit_bps},
-                {"Item": "Capital", "ZAR": capital_zar, "BPS": capital_bps},
-                {"Item": "<b>Net Spread</b>", "ZAR": net_spread_zar, "BPS": net_spread_bps},
-                {"Item": "", "ZAR": "", "BPS": ""},
-
-                # (Undrawn portion - Commitment)
-                {"Item": "<b>Commitment Fee</b>", "ZAR": commitment_fee_zar, "BPS": commitment_fee_bps},
-                {"Item": "Funding", "ZAR": comm_fee_funding_zar, "BPS": commitment_fee_funding_bps},
-                {"Item": "Credit Cost", "ZAR": comm_fee_credit_zar, "BPS": commitment_fee_credit_bps},
-                {"Item": "Capital Cost", "ZAR": comm_fee_capital_zar, "BPS": commitment_fee_capital_bps},
-                {"Item": "<b>Net Spread</b>", "ZAR": net_spread_commit_fees_zar, "BPS": net_spread_commit_fees_bps},
-
-                {"Item": "", "ZAR": "", "BPS": ""},
-
-                # (Blended View)
-                {"Item": "<b>Blended View</b>", "ZAR": "", "BPS": ""},
-                {"Item": "  Margin", "ZAR": blended_view_margin_zar, "BPS": blended_view_margin_bps},
-                {"Item": "  Funding", "ZAR": blended_view_funding_zar, "BPS": blended_view_funding_bps},
-                {"Item": "  CLN Cost", "ZAR": blended_view_cln_zar, "BPS": blended_view_cln_bps},
-                {"Item": "  Credit", "ZAR": blended_view_credit_zar, "BPS": blended_view_credit_bps},
-                {"Item": "  Capital", "ZAR": blended_view_capital_zar, "BPS": blended_view_capital_bps},
-                {"Item": "<b>Net Revenue</b>", "ZAR": blended_view_net_revenue_zar,
-                 "BPS": blended_view_net_revenue_bps},
-                {"Item": "<b>ROC (bps)</b>", "ZAR": "", "BPS": blended_view_roc_bps},
-
-                {"Item": "", "ZAR": "", "BPS": ""},
-
-                # (Facility + Drawn/Undrawn)
-                {"Item": "<b>Facility Amount</b>", "ZAR": rcf_limit, "BPS": "100%"},
-                {"Item": "<b>Drawn</b>", "ZAR": drawn_amount, "BPS": f"{drawn_percentage * 100:.0f}%"},
-                {"Item": "<b>Undrawn</b>", "ZAR": undrawn_amount, "BPS": f"{undrawn_percentage * 100:.0f}%"},
-            ]
-
-            st.subheader("NO CLN Output Table")
-            
-            # Add html2canvas library and download functionality
-            html2canvas_js = """
-            <script src="https://html2canvas.hertzen.com/dist/html2canvas.min.js"></script>
-            <script>
-            function downloadTableAsImage() {
-                const table = document.querySelector('.rcf-table');
-                html2canvas(table).then(canvas => {
-                    const link = document.createElement('a');
-                    link.download = 'table.png';
-                    link.href = canvas.toDataURL();
-                    link.click();
-                });
-            }
-            </script>
-            """
-
-            # Define CSS
-            custom_css = """
-            <style>
-            .rcf-table {
-                width: 100%;
-                border-collapse: collapse;
-                font-family: -apple-system, system-ui, BlinkMacSystemFont, "Segoe UI", Roboto;
-            }
-
-            /* Column Headers */
-            .rcf-table thead th {
-                background-color: #4A5568;
-                color: white;
-                padding: 12px 16px;
-                text-align: left;
-                font-weight: 500;
-                border: 1px solid #2D3748;
-            }
-
-            /* All cells */
-            .rcf-table td {
-                padding: 8px 16px;
-                border: 1px solid #E2E8F0;
-            }
-
-            /* Section headers (blue background) */
-            .rcf-table tr.section-header {
-                background-color: #EBF8FF;
-            }
-            .rcf-table tr.section-header td {
-                color: #2C5282;
-                font-weight: 600;
-            }
-
-            /* Regular rows */
-            .rcf-table tr:not(.section-header) {
-                background-color: white;
-            }
-
-            /* Number columns */
-            .rcf-table td:nth-child(2),
-            .rcf-table td:nth-child(3) {
-                text-align: right;
-                font-family: "SFMono-Regular", Consolas, "Liberation Mono", Menlo, monospace;
-            }
-
-            /* Negative numbers */
-            .rcf-table td:nth-child(2),
-            .rcf-table td:nth-child(3) {
-                color: #2D3748;
-            }
-
-            /* Empty rows */
-            .rcf-table tr:has(td:empty) {
-                height: 8px;
-                background-color: white;
-            }
-            </style>
-            """
-
-            # Build the table HTML
-            df = pd.DataFrame(rows, columns=["Item", "ZAR", "BPS"])
-            df["ZAR"] = df["ZAR"].apply(format_negatives)
-            df["BPS"] = df["BPS"].apply(format_negatives)
-            html_table = df.to_html(index=False, border=0, escape=False)
-            html_table = html_table.replace('class="dataframe"', 'class="rcf-table"')
-            html_table = html_table.replace('<tr>', '<tr class="data-row">')
-            html_table = html_table.replace('<tr class="data-row"><td><b>', '<tr class="section-header"><td><b>')
-
-            # Add download image button to HTML with full width styling
-            screenshot_button = """
-            <button onclick="downloadTableAsImage()" 
-                    style="width: 100%; padding: 12px 20px; 
-                    background-color: #2B6CB0; color: white; 
-                    border: none; border-radius: 4px; 
-                    cursor: pointer; font-family: -apple-system, system-ui;
-                    font-size: 14px; font-weight: 500;
-                    margin: 10px 0;">
-                📸 Download as Image
-            </button>
-            """
-
-            # Add CSS for Streamlit button to match
-            st.markdown("""
-                <style>
-                .stDownloadButton button {
-                    width: 100% !important;
-                    padding: 12px 20px !important;
-                    background-color: #2B6CB0 !important;
-                    color: white !important;
-                    border: none !important;
-                    border-radius: 4px !important;
-                    font-size: 14px !important;
-                    font-weight: 500 !important;
-                    margin: 0 !important;  /* Remove all margins */
+                st.session_state.table_data = {
+                    "company_name": company_name,
+                    "rows": rows,
+                    "cln_rows": cln_rows,
+                    "comparison_header": comparison_header,
+                    "comparison_rows": comparison_rows,
                 }
-                .stDownloadButton {
-                    margin: 0 !important;  /* Remove container margins too */
-                    padding: 0 !important;  /* Remove container padding */
-                }
-                </style>
-            """, unsafe_allow_html=True)
-
-            # Add CSV download button at the top
-            st.download_button(
-                label="📊 Download CSV",
-                data=df.to_csv(index=False).encode('utf-8'),
-                file_name=f"{company_name}_rcf_cln_calculation.csv",
-                mime='text/csv'
-            )
 
-            # Display table with image download button at bottom
-            final_html = html2canvas_js + custom_css + html_table + screenshot_button
-            components.html(final_html, height=1000, scrolling=True)
-
-            # Add context after the table and buttons
-            st.markdown("""
-                <small>
-                ℹ️ **Note:** The table above shows:
-                - Drawn portion calculations (margin and costs)
-                - Undrawn portion calculations (commitment fees)
-                - Blended view combining both portions
-                - Return on Capital (ROC) metrics
-                </small>
-            """, unsafe_allow_html=True)
-
-            # CLN Calculations (if enabled)
-            if include_cln and cln_amount > 0:
-                # Ensure CLN amount doesn't exceed limit
-                cln_amount = min(cln_amount, rcf_limit)
-                cln_percentage = cln_amount / rcf_limit
-
-                # CLN margin (same as base)
-                cln_margin_bps = margin_bps
-                cln_margin_zar = drawn_amount * (cln_margin_bps / 10_000)
-
-                # Funding same as no cln
-                cln_funding_bps = funding_bps
-                cln_funding_zar = funding_zar
-
-                # Credit, capital scaled by (1 - cln_percentage)
-                cln_credit_bps = credit_bps * (1 - cln_percentage)
-                cln_credit_zar = drawn_amount * (cln_credit_bps / 10_000)
-
-                cln_capital_bps = capital_bps * (1 - cln_percentage)
-                cln_capital_zar = drawn_amount * (cln_capital_bps / 10_000)
-
-                # First calculate CLN specific costs
-                cln_specific_cost_zar = cln_amount * (cln_cost_bps / 10_000)  # G17
-
-                # Calculate CLN Total Cost
-                cln_total_cost_bps = cln_funding_bps + cln_credit_bps + cln_capital_bps
-                cln_total_cost_zar = drawn_amount * (cln_total_cost_bps / 10_000)
-
-                # Calculate CLN Net Spread
-                cln_net_spread_zar = cln_margin_zar + cln_total_cost_zar
-                cln_net_spread_bps = cln_margin_bps + cln_total_cost_bps
-
-                # Calculate CLN Commitment Fee components
-                cln_commitment_fee_bps = commitment_fee_bps  # Same as No CLN
-                cln_commitment_fee_zar = undrawn_amount * (cln_commitment_fee_bps / 10_000)
-
-                cln_comm_fee_funding_bps = commitment_fee_funding_bps  # Same as No CLN
-                cln_comm_fee_funding_zar = undrawn_amount * (cln_comm_fee_funding_bps / 10_000)
-
-                # Scale commitment fee credit & capital
-                cln_commit_fee_credit_bps = commitment_fee_credit_bps * (1 - cln_percentage)
-                cln_commit_fee_credit_zar = undrawn_amount * (cln_commit_fee_credit_bps / 10_000)
-
-                cln_commit_fee_capital_bps = commitment_fee_capital_bps * (1 - cln_percentage)
-                cln_commit_fee_capital_zar = undrawn_amount * (cln_commit_fee_capital_bps / 10_000)
-
-                # Calculate Net Spread for Commitment Fees
-                cln_commit_fee_total_bps = (
-                        cln_commitment_fee_bps  # Fee
-                        + cln_comm_fee_funding_bps  # Funding
-                        + cln_commit_fee_credit_bps  # Credit
-                        + cln_commit_fee_capital_bps  # Capital
-                )
+        # Rendered on every run so display-only reruns keep the last results
+        render_results(compare_mode)
 
-                # Calculate Net Spread BPS and ZAR
-                cln_net_commit_fee_bps = cln_commit_fee_total_bps
-                cln_net_commit_fee_zar = undrawn_amount * (cln_net_commit_fee_bps / 10_000)
-
-                # Calculate Blended View components
-                cln_blended_margin_zar = cln_margin_zar + cln_commitment_fee_zar
-                cln_blended_margin_bps = (cln_margin_bps * drawn_percentage) + (commitment_fee_bps * undrawn_percentage)
-
-                cln_blended_funding_zar = cln_funding_zar + cln_comm_fee_funding_zar
-                cln_blended_funding_bps = (cln_funding_bps * drawn_percentage) + (
-                            cln_comm_fee_funding_bps * undrawn_percentage)
-
-                cln_blended_credit_zar = cln_credit_zar + cln_commit_fee_credit_zar
-                cln_blended_credit_bps = (cln_credit_bps * drawn_percentage) + (
-                            cln_commit_fee_credit_bps * undrawn_percentage)
-
-                cln_blended_capital_zar = cln_capital_zar + cln_commit_fee_capital_zar
-                cln_blended_capital_bps = (cln_capital_bps * drawn_percentage) + (
-                            cln_commit_fee_capital_bps * undrawn_percentage)
-
-                # CLN Cost for Blended View
-                blended_cln_cost_zar = cln_specific_cost_zar  # G22 = G17
-                blended_cln_cost_bps = cln_cost_bps * cln_percentage  # H22 = H17 * CLN%
-
-                # Now calculate net revenue
-                cln_blended_netrev_zar = (
-                        cln_blended_margin_zar  # Margin (positive)
-                        + cln_blended_funding_zar  # Funding (negative)
-                        + blended_cln_cost_zar  # CLN Cost (negative)
-                        + cln_blended_credit_zar  # Credit (negative)
-                        + cln_blended_capital_zar  # Capital (negative)
-                )
-
-                cln_blended_netrev_bps = (
-                        cln_blended_margin_bps  # Margin (positive)
-                        + cln_blended_funding_bps  # Funding (negative)
-                        + blended_cln_cost_bps  # CLN Cost (negative)
-                        + cln_blended_credit_bps  # Credit (negative)
-                        + cln_blended_capital_bps  # Capital (negative)
-                )
-
-                # Calculate ROC for CLN scenario
-                if cln_blended_capital_bps != 0:
-                    cln_roc_bps = (
-                            (cln_blended_margin_bps
-                             + cln_blended_funding_bps
-                             + blended_cln_cost_bps
-                             + cln_blended_credit_bps)
-                            / (-cln_blended_capital_bps)
-                            * cap_cost
-                    )
-                else:
-                    cln_roc_bps = 0
-
-                # CLN rows definition with correct indentation
-                cln_rows = [
-                    {"Item": "<b>CLN Scenario</b>", "ZAR": "", "BPS": ""},
-                    {"Item": "CLN Amount", "ZAR": cln_amount, "BPS": f"{cln_percentage * 100:.0f}%"},
-                    {"Item": "<b>Margin</b>", "ZAR": cln_margin_zar, "BPS": cln_margin_bps},
-                    {"Item": "<b>Total Cost</b>", "ZAR": cln_total_cost_zar, "BPS": cln_total_cost_bps},
-                    {"Item": "Funding", "ZAR": cln_funding_zar, "BPS": cln_funding_bps},
-                    {"Item": "Credit", "ZAR": cln_credit_zar, "BPS": cln_credit_bps},
-                    {"Item": "Capital", "ZAR": cln_capital_zar, "BPS": cln_capital_bps},
-                    {"Item": "<b>Net Spread</b>", "ZAR": cln_net_spread_zar, "BPS": cln_net_spread_bps},
-                    {"Item": "", "ZAR": "", "BPS": ""},
-                    {"Item": "<b>Commitment Fee</b>", "ZAR": cln_commitment_fee_zar, "BPS": cln_commitment_fee_bps},
-                    {"Item": "Funding", "ZAR": cln_comm_fee_funding_zar, "BPS": cln_comm_fee_funding_bps},
-                    {"Item": "Credit Cost", "ZAR": cln_commit_fee_credit_zar, "BPS": cln_commit_fee_credit_bps},
-                    {"Item": "Capital Cost", "ZAR": cln_commit_fee_capital_zar, "BPS": cln_commit_fee_capital_bps},
-                    {"Item": "<b>Net Spread</b>", "ZAR": cln_net_commit_fee_zar, "BPS": cln_net_commit_fee_bps},
-                    {"Item": "", "ZAR": "", "BPS": ""},
-                    {"Item": "<b>CLN Cost</b>", "ZAR": cln_specific_cost_zar, "BPS": cln_cost_bps},
-                    {"Item": "", "ZAR": "", "BPS": ""},
-                    {"Item": "<b>Blended View</b>", "ZAR": "", "BPS": ""},
-                    {"Item": "Margin", "ZAR": cln_blended_margin_zar, "BPS": cln_blended_margin_bps},
-                    {"Item": "Funding", "ZAR": cln_blended_funding_zar, "BPS": cln_blended_funding_bps},
-                    {"Item": "CLN Cost", "ZAR": blended_cln_cost_zar, "BPS": blended_cln_cost_bps},
-                    {"Item": "Credit", "ZAR": cln_blended_credit_zar, "BPS": cln_blended_credit_bps},
-                    {"Item": "Capital", "ZAR": cln_blended_capital_zar, "BPS": cln_blended_capital_bps},
-                    {"Item": "<b>Net Revenue</b>", "ZAR": cln_blended_netrev_zar, "BPS": cln_blended_netrev_bps},
-                    {"Item": "<b>ROC (bps)</b>", "ZAR": "", "BPS": cln_roc_bps},
-                    {"Item": "", "ZAR": "", "BPS": ""},
-                    {"Item": "<b>Facility Amount</b>", "ZAR": rcf_limit, "BPS": "100%"},
-                    {"Item": "<b>Drawn</b>", "ZAR": drawn_amount, "BPS": f"{drawn_percentage * 100:.0f}%"},
-                    {"Item": "<b>Undrawn</b>", "ZAR": undrawn_amount, "BPS": f"{undrawn_percentage * 100:.0f}%"}
-                ]
-
-                # Then use the display mode check
-                if compare_mode == "Show CLN Table Only":
-                    st.subheader("CLN Scenario Results")
-                    
-                    # Add CSV download button ABOVE the table (full width)
-                    st.download_button(
-                        label="📊 Download CSV",
-                        data=pd.DataFrame(cln_rows).to_csv(index=False).encode('utf-8'),
-                        file_name=f"{company_name}_cln_scenario.csv",
-                        mime='text/csv',
-                        use_container_width=True
-                    )
-                    
-                    # Display table
-                    df_cln = pd.DataFrame(cln_rows)
-                    display_table(df_cln)
-                    
-                    # Add image download button BELOW the table
-                    html2canvas_js = """
-                    <script src="https://html2canvas.hertzen.com/dist/html2canvas.min.js"></script>
-                    <script>
-                    function downloadTableImage() {
-                        const table = document.querySelector('.rcf-table');
-                        const options = {
-                            scale: 2,
-                            useCORS: true,
-                            backgroundColor: '#ffffff'
-                        };
-                        
-                        html2canvas(table, options).then(canvas => {
-                            const image = canvas.toDataURL('image/png', 1.0);
-                            const link = document.createElement('a');
-                            link.href = image;
-                            link.download = 'comparison_table.png';
-                            document.body.appendChild(link);
-                            link.click();
-                            document.body.removeChild(link);
-                        });
-                    }
-                    </script>
-                    <div style='width: 100%; padding: 10px 0;'>
-                        <button onclick="downloadTableImage()" 
-                                style="width: 100%;
-                                       background-color: rgb(43, 108, 176);
-                                       color: white;
-                                       padding: 0.6rem 0.6rem;
-                                       border: none;
-                                       border-radius: 0.25rem;
-                                       cursor: pointer;
-                                       font-weight: 500;
-                                       font-size: 1rem;
-                                       line-height: 1.4;
-                                       transition: background-color 0.2s;">
-                            📷 Download Image
-                        </button>
-                    </div>
-                    """
-                    components.html(html2canvas_js, height=70)
-                elif compare_mode == "Compare: No CLN vs. CLN":
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.subheader("No CLN Scenario")
-                        # Add CSV download button
-                        st.download_button(
-                            label="📊 Download No CLN CSV",
-                            data=pd.DataFrame(rows).to_csv(index=False).encode('utf-8'),
-                            file_name=f"{company_name}_no_cln.csv",
-                            mime='text/csv',
-                            use_container_width=True
-                        )
-                        # Display table
-                        df_no_cln = pd.DataFrame(rows)
-                        display_table(df_no_cln)
-                        
-                    with col2:
-                        st.subheader("CLN Scenario")
-                        # Add CSV download button
-                        st.download_button(
-                            label="📊 Download CLN CSV",
-                            data=pd.DataFrame(cln_rows).to_csv(index=False).encode('utf-8'),
-                            file_name=f"{company_name}_cln.csv",
-                            mime='text/csv',
-                            use_container_width=True
-                        )
-                        # Display table
-                        df_cln = pd.DataFrame(cln_rows)
-                        display_table(df_cln)
-
-                    # Add image download button for both tables
-                    html2canvas_js = """
-                    <script src="https://html2canvas.hertzen.com/dist/html2canvas.min.js"></script>
-                    <script>
-                    function downloadTableImage() {
-                        const tables = document.querySelectorAll('.rcf-table');
-                        let combinedCanvas = document.createElement('canvas');
-                        let ctx = combinedCanvas.getContext('2d');
-                        let totalWidth = 0;
-                        let maxHeight = 0;
-                        
-                        Promise.all(Array.from(tables).map(table => 
-                            html2canvas(table, {
-                                scale: 2,
-                                useCORS: true,
-                                backgroundColor: '#ffffff'
-                            })
-                        )).then(canvases => {
-                            totalWidth = canvases.reduce((sum, canvas) => sum + canvas.width, 0);
-                            maxHeight = Math.max(...canvases.map(canvas => canvas.height));
-                            
-                            combinedCanvas.width = totalWidth;
-                            combinedCanvas.height = maxHeight;
-                            
-                            let xOffset = 0;
-                            canvases.forEach(canvas => {
-                                ctx.drawImage(canvas, xOffset, 0);
-                                xOffset += canvas.width;
-                            });
-                            
-                            const link = document.createElement('a');
-                            link.href = combinedCanvas.toDataURL('image/png', 1.0);
-                            link.download = 'comparison_tables.png';
-                            document.body.appendChild(link);
-                            link.click();
-                            document.body.removeChild(link);
-                        });
-                    }
-                    </script>
-                    <div style='width: 100%; padding: 10px 0;'>
-                        <button onclick="downloadTableImage()" 
-                                style="width: 100%;
-                                       background-color: rgb(43, 108, 176);
-                                       color: white;
-                                       padding: 0.6rem 0.6rem;
-                                       border: none;
-                                       border-radius: 0.25rem;
-                                       cursor: pointer;
-                                       font-weight: 500;
-                                       font-size: 1rem;
-                                       line-height: 1.4;
-                                       transition: background-color 0.2s;">
-                            📷 Download Image
-                        </button>
-                    </div>
-                    """
-                    components.html(html2canvas_js, height=70)
-                elif compare_mode == "Single Comparison Table":
-                    st.subheader("CLN Comparison Analysis")
-                    
-                    # Create the comparison table structure
-                    comparison_rows = [
-                        {"Item": f"{company_name}", "NO CLN_ZAR": "", "NO CLN_bps": "", f"R{cln_amount:,.0f} CLN_ZAR": "", f"R{cln_amount:,.0f} CLN_bps": "", "Differential": "", "bps": ""},
-                        # Drawn portion
-                        {"Item": "Margin", "NO CLN_ZAR": margin_zar, "NO CLN_bps": margin_bps, 
-                         f"R{cln_amount:,.0f} CLN_ZAR": cln_margin_zar, f"R{cln_amount:,.0f} CLN_bps": cln_margin_bps, 
-                         "Differential": cln_margin_zar - margin_zar, "bps": cln_margin_bps - margin_bps},
-                        {"Item": "Total Cost", "NO CLN_ZAR": total_cost_zar, "NO CLN_bps": total_cost_bps, 
-                         f"R{cln_amount:,.0f} CLN_ZAR": cln_total_cost_zar, f"R{cln_amount:,.0f} CLN_bps": cln_total_cost_bps, 
-                         "Differential": cln_total_cost_zar - total_cost_zar, "bps": cln_total_cost_bps - total_cost_bps},
-                        {"Item": "Funding", "NO CLN_ZAR": funding_zar, "NO CLN_bps": funding_bps, 
-                         f"R{cln_amount:,.0f} CLN_ZAR": cln_funding_zar, f"R{cln_amount:,.0f} CLN_bps": cln_funding_bps, 
-                         "Differential": cln_funding_zar - funding_zar, "bps": cln_funding_bps - funding_bps},
-                        {"Item": "Credit", "NO CLN_ZAR": credit_zar, "NO CLN_bps": credit_bps, 
-                         f"R{cln_amount:,.0f} CLN_ZAR": cln_credit_zar, f"R{cln_amount:,.0f} CLN_bps": cln_credit_bps, 
-                         "Differential": cln_credit_zar - credit_zar, "bps": cln_credit_bps - credit_bps},
-                        {"Item": "Capital", "NO CLN_ZAR": capital_zar, "NO CLN_bps": capital_bps, 
-                         f"R{cln_amount:,.0f} CLN_ZAR": cln_capital_zar, f"R{cln_amount:,.0f} CLN_bps": cln_capital_bps, 
-                         "Differential": cln_capital_zar - capital_zar, "bps": cln_capital_bps - capital_bps},
-                        {"Item": "Net Spread", "NO CLN_ZAR": net_spread_zar, "NO CLN_bps": net_spread_bps, 
-                         f"R{cln_amount:,.0f} CLN_ZAR": cln_net_spread_zar, f"R{cln_amount:,.0f} CLN_bps": cln_net_spread_bps, 
-                         "Differential": cln_net_spread_zar - net_spread_zar, "bps": cln_net_spread_bps - net_spread_bps},
-                        # Empty row
-                        {"Item": "", "NO CLN_ZAR": "", "NO CLN_bps": "", f"R{cln_amount:,.0f} CLN_ZAR": "", f"R{cln_amount:,.0f} CLN_bps": "", "Differential": "", "bps": ""},
-                        # Commitment Fee section
-                        {"Item": "Commitment fee", "NO CLN_ZAR": commitment_fee_zar, "NO CLN_bps": commitment_fee_bps, 
-                         f"R{cln_amount:,.0f} CLN_ZAR": cln_commitment_fee_zar, f"R{cln_amount:,.0f} CLN_bps": cln_commitment_fee_bps, 
-                         "Differential": cln_commitment_fee_zar - commitment_fee_zar, "bps": cln_commitment_fee_bps - commitment_fee_bps},
-                        {"Item": "Funding", "NO CLN_ZAR": comm_fee_funding_zar, "NO CLN_bps": commitment_fee_funding_bps,
-                         f"R{cln_amount:,.0f} CLN_ZAR": cln_comm_fee_funding_zar, f"R{cln_amount:,.0f} CLN_bps": cln_comm_fee_funding_bps,
-                         "Differential": cln_comm_fee_funding_zar - comm_fee_funding_zar, "bps": cln_comm_fee_funding_bps - commitment_fee_funding_bps},
-                        {"Item": "Credit Cost", "NO CLN_ZAR": comm_fee_credit_zar, "NO CLN_bps": commitment_fee_credit_bps,
-                         f"R{cln_amount:,.0f} CLN_ZAR": cln_commit_fee_credit_zar, f"R{cln_amount:,.0f} CLN_bps": cln_commit_fee_credit_bps,
-                         "Differential": cln_commit_fee_credit_zar - comm_fee_credit_zar, "bps": cln_commit_fee_credit_bps - commitment_fee_credit_bps},
-                        {"Item": "Capital Cost", "NO CLN_ZAR": comm_fee_capital_zar, "NO CLN_bps": commitment_fee_capital_bps,
-                         f"R{cln_amount:,.0f} CLN_ZAR": cln_commit_fee_capital_zar, f"R{cln_amount:,.0f} CLN_bps": cln_commit_fee_capital_bps,
-                         "Differential": cln_commit_fee_capital_zar - comm_fee_capital_zar, "bps": cln_commit_fee_capital_bps - commitment_fee_capital_bps},
-                        {"Item": "Net Spread", "NO CLN_ZAR": net_spread_commit_fees_zar, "NO CLN_bps": net_spread_commit_fees_bps,
-                         f"R{cln_amount:,.0f} CLN_ZAR": cln_net_commit_fee_zar, f"R{cln_amount:,.0f} CLN_bps": cln_net_commit_fee_bps,
-                         "Differential": cln_net_commit_fee_zar - net_spread_commit_fees_zar, "bps": cln_net_commit_fee_bps - net_spread_commit_fees_bps},
-                        # Empty row
-                        {"Item": "", "NO CLN_ZAR": "", "NO CLN_bps": "", f"R{cln_amount:,.0f} CLN_ZAR": "", f"R{cln_amount:,.0f} CLN_bps": "", "Differential": "", "bps": ""},
-                        # CLN Cost
-                        {"Item": "CLN Cost", "NO CLN_ZAR": "-", "NO CLN_bps": "-",
-                         f"R{cln_amount:,.0f} CLN_ZAR": cln_specific_cost_zar, f"R{cln_amount:,.0f} CLN_bps": cln_cost_bps,
-                         "Differential": cln_specific_cost_zar, "bps": cln_cost_bps},
-                        # Empty row
-                        {"Item": "", "NO CLN_ZAR": "", "NO CLN_bps": "", f"R{cln_amount:,.0f} CLN_ZAR": "", f"R{cln_amount:,.0f} CLN_bps": "", "Differential": "", "bps": ""},
-                        # Blended View
-                        {"Item": "Blended View", "NO CLN_ZAR": "", "NO CLN_bps": "", f"R{cln_amount:,.0f} CLN_ZAR": "", f"R{cln_amount:,.0f} CLN_bps": "", "Differential": "", "bps": ""},
-                        {"Item": "Margin", "NO CLN_ZAR": blended_view_margin_zar, "NO CLN_bps": blended_view_margin_bps,
-                         f"R{cln_amount:,.0f} CLN_ZAR": cln_blended_margin_zar, f"R{cln_amount:,.0f} CLN_bps": cln_blended_margin_bps,
-                         "Differential": cln_blended_margin_zar - blended_view_margin_zar, "bps": cln_blended_margin_bps - blended_view_margin_bps},
-                        {"Item": "Funding", "NO CLN_ZAR": blended_view_funding_zar, "NO CLN_bps": blended_view_funding_bps,
-                         f"R{cln_amount:,.0f} CLN_ZAR": cln_blended_funding_zar, f"R{cln_amount:,.0f} CLN_bps": cln_blended_funding_bps,
-                         "Differential": cln_blended_funding_zar - blended_view_funding_zar, "bps": cln_blended_funding_bps - blended_view_funding_bps},
-                        {"Item": "CLN Cost", "NO CLN_ZAR": "-", "NO CLN_bps": "-",
-                         f"R{cln_amount:,.0f} CLN_ZAR": blended_cln_cost_zar, f"R{cln_amount:,.0f} CLN_bps": blended_cln_cost_bps,
-                         "Differential": blended_cln_cost_zar, "bps": blended_cln_cost_bps},
-                        {"Item": "Credit", "NO CLN_ZAR": blended_view_credit_zar, "NO CLN_bps": blended_view_credit_bps,
-                         f"R{cln_amount:,.0f} CLN_ZAR": cln_blended_credit_zar, f"R{cln_amount:,.0f} CLN_bps": cln_blended_credit_bps,
-                         "Differential": cln_blended_credit_zar - blended_view_credit_zar, "bps": cln_blended_credit_bps - blended_view_credit_bps},
-                        {"Item": "Capital", "NO CLN_ZAR": blended_view_capital_zar, "NO CLN_bps": blended_view_capital_bps,
-                         f"R{cln_amount:,.0f} CLN_ZAR": cln_blended_capital_zar, f"R{cln_amount:,.0f} CLN_bps": cln_blended_capital_bps,
-                         "Differential": cln_blended_capital_zar - blended_view_capital_zar, "bps": cln_blended_capital_bps - blended_view_capital_bps},
-                        {"Item": "Net Revenue", "NO CLN_ZAR": blended_view_net_revenue_zar, "NO CLN_bps": blended_view_net_revenue_bps,
-                         f"R{cln_amount:,.0f} CLN_ZAR": cln_blended_netrev_zar, f"R{cln_amount:,.0f} CLN_bps": cln_blended_netrev_bps,
-                         "Differential": cln_blended_netrev_zar - blended_view_net_revenue_zar, "bps": cln_blended_netrev_bps - blended_view_net_revenue_bps},
-                        {"Item": "", "NO CLN_ZAR": "", "NO CLN_bps": "", f"R{cln_amount:,.0f} CLN_ZAR": "", f"R{cln_amount:,.0f} CLN_bps": "", "Differential": "", "bps": ""},
-                        
-                        # ROC
-                        {"Item": "ROC", "NO CLN_ZAR": "", "NO CLN_bps": f"{blended_view_roc_bps:.2f}%",
-                         f"R{cln_amount:,.0f} CLN_ZAR": "", f"R{cln_amount:,.0f} CLN_bps": "⚠" if cln_roc_bps > 999 else f"{cln_roc_bps:.2f}%",
-                         "Differential": "", "bps": "⚠" if cln_roc_bps > 999 else f"{(cln_roc_bps - blended_view_roc_bps):.2f}%"},
-                        {"Item": "", "NO CLN_ZAR": "", "NO CLN_bps": "", f"R{cln_amount:,.0f} CLN_ZAR": "", f"R{cln_amount:,.0f} CLN_bps": "", "Differential": "", "bps": ""},
-                        
-                        # Facility Information
-                        {"Item": "Facility Amount", "NO CLN_ZAR": rcf_limit, "NO CLN_bps": "100%",
-                         f"R{cln_amount:,.0f} CLN_ZAR": rcf_limit, f"R{cln_amount:,.0f} CLN_bps": "100%", "Differential": "", "bps": ""},
-                        {"Item": "Drawn", "NO CLN_ZAR": drawn_amount, "NO CLN_bps": f"{drawn_percentage*100:.0f}%",
-                         f"R{cln_amount:,.0f} CLN_ZAR": drawn_amount, f"R{cln_amount:,.0f} CLN_bps": f"{drawn_percentage*100:.0f}%", "Differential": "", "bps": ""},
-                        {"Item": "Undrawn", "NO CLN_ZAR": undrawn_amount, "NO CLN_bps": f"{undrawn_percentage*100:.0f}%",
-                         f"R{cln_amount:,.0f} CLN_ZAR": undrawn_amount, f"R{cln_amount:,.0f} CLN_bps": f"{undrawn_percentage*100:.0f}%", "Differential": "", "bps": ""},
-                        {"Item": "", "NO CLN_ZAR": "", "NO CLN_bps": "", f"R{cln_amount:,.0f} CLN_ZAR": "", f"R{cln_amount:,.0f} CLN_bps": "", "Differential": "", "bps": ""},
-                        
-                        # CLN Note
-                        {"Item": "CLN Note", "NO CLN_ZAR": "-", "NO CLN_bps": "0%",
-                         f"R{cln_amount:,.0f} CLN_ZAR": cln_amount, f"R{cln_amount:,.0f} CLN_bps": f"{cln_percentage*100:.0f}%", "Differential": "", "bps": ""}
-                    ]
-                    
-                    # Add CSV download button ABOVE the table (full width)
-                    st.download_button(
-                        label="📊 Download CSV",
-                        data=pd.DataFrame(comparison_rows).to_csv(index=False).encode('utf-8'),
-                        file_name=f"{company_name}_cln_comparison.csv",
-                        mime='text/csv',
-                        use_container_width=True
-                    )
-                    
-                    # Display the table
-                    df_comparison = pd.DataFrame(comparison_rows)
-                    display_table(df_comparison)
-                    
-                    # Add image download button BELOW the table with fixed JavaScript
-                    html2canvas_js = """
-                    <script src="https://html2canvas.hertzen.com/dist/html2canvas.min.js"></script>
-                    <script>
-                    function downloadTableImage() {
-                        const table = document.querySelector('.rcf-table');
-                        const options = {
-                            scale: 2,
-                            useCORS: true,
-                            backgroundColor: '#ffffff'
-                        };
-                        
-                        html2canvas(table, options).then(canvas => {
-                            const image = canvas.toDataURL('image/png', 1.0);
-                            const link = document.createElement('a');
-                            link.href = image;
-                            link.download = 'comparison_table.png';
-                            document.body.appendChild(link);
-                            link.click();
-                            document.body.removeChild(link);
-                        });
-                    }
-                    </script>
-                    <div style='width: 100%; padding: 10px 0;'>
-                        <button onclick="downloadTableImage()" 
-                                style="width: 100%;
-                                       background-color: rgb(43, 108, 176);
-                                       color: white;
-                                       padding: 0.6rem 0.6rem;
-                                       border: none;
-                                       border-radius: 0.25rem;
-                                       cursor: pointer;
-                                       font-weight: 500;
-                                       font-size: 1rem;
-                                       line-height: 1.4;
-                                       transition: background-color 0.2s;">
-                            📷 Download Image
-                        </button>
-                    </div>
-                    """
-                    
-                    components.html(html2canvas_js, height=70)
+        # Batch what-if grid on the last submitted inputs; its own lists rerun only the fragment
+        render_what_if(rcf_limit, (margin_bps, funding_bps, credit_bps, capital_bps,
+                                   commitment_fee_bps, commitment_fee_funding_bps,
+                                   commitment_fee_credit_bps, commitment_fee_capital_bps))
 
     ############################################################################
     #                           TAB 2: EXPLANATION
@@ -1198,82 +1192,8 @@ def main():
         # Add a subtle divider
         st.markdown("<hr style='margin: 2rem 0; border: none; border-top: 1px solid #f0f0f0;'>", unsafe_allow_html=True)
 
-        # General Overview
-        st.markdown("## Overview")
-        st.write("""
-        The RCF-CLN Calculator determines the profitability and returns for Revolving Credit Facilities (RCF). 
-        The calculations consider both drawn and undrawn portions of the facility.
-        """)
-
-        # Drawn Portion Calculations
-        st.markdown("## Drawn Portion")
-        
-        st.markdown("### Margin")
-        st.write("The margin is calculated on the drawn amount:")
-        st.latex(r"\text{Margin (ZAR)} = \text{Drawn Amount} \times \frac{\text{Margin (bps)}}{10,000}")
-        
-        st.markdown("### Total Cost Components")
-        st.write("The total cost consists of three main components:")
-        
-        st.markdown("1. **Funding Cost**")
-        st.latex(r"\text{Funding (ZAR)} = \text{Drawn Amount} \times \frac{\text{Funding (bps)}}{10,000}")
-        
-        st.markdown("2. **Credit Cost**")
-        st.latex(r"\text{Credit (ZAR)} = \text{Drawn Amount} \times \frac{\text{Credit (bps)}}{10,000}")
-        
-        st.markdown("3. **Capital Cost**")
-        st.latex(r"\text{Capital (ZAR)} = \text{Drawn Amount} \times \frac{\text{Capital (bps)}}{10,000}")
-        
-        st.markdown("### Net Spread (Drawn)")
-        st.write("The net spread for the drawn portion is:")
-        st.latex(r"\text{Net Spread (ZAR)} = \text{Margin} + \text{Total Cost}")
-        st.latex(r"\text{Net Spread (bps)} = (\text{Margin bps} + \text{Total Cost bps}) \times \text{Drawn \%}")
-
-        # Undrawn Portion Calculations
-        st.markdown("## Undrawn Portion (Commitment Fee)")
-        
-        st.markdown("### Commitment Fee")
-        st.latex(r"\text{Fee (ZAR)} = \text{Undrawn Amount} \times \frac{\text{Commitment Fee (bps)}}{10,000}")
-        
-        st.markdown("### Associated Costs")
-        st.write("Similar to the drawn portion, there are three cost components:")
-        
-        st.markdown("1. **Funding Cost**")
-        st.latex(
-            r"\text{Funding (ZAR)} = \text{Undrawn Amount} \times \frac{\text{Commitment Fee Funding (bps)}}{10,000}")
-        
-        st.markdown("2. **Credit Cost**")
-        st.latex(
-            r"\text{Credit (ZAR)} = \text{Undrawn Amount} \times \frac{\text{Commitment Fee Credit (bps)}}{10,000}")
-        
-        st.markdown("3. **Capital Cost**")
-        st.latex(
-            r"\text{Capital (ZAR)} = \text{Undrawn Amount} \times \frac{\text{Commitment Fee Capital (bps)}}{10,000}")
-
-        # Blended View Calculations
-        st.markdown("## Blended View")
-        st.write("The blended view combines both drawn and undrawn portions:")
-        
-        st.markdown("### Net Revenue")
-        st.latex(
-            r"\text{Net Revenue (ZAR)} = \text{Margin} + \text{Funding} + \text{CLN} + \text{Credit} + \text{Capital}")
-        st.write("Where each component combines both drawn and undrawn portions.")
-        
-        st.markdown("### Return on Capital (ROC)")
-        st.write("ROC is calculated as:")
-        st.latex(
-            r"\text{ROC (bps)} = \frac{\text{Margin} + \text{Funding} + \text{CLN} + \text{Credit}}{-\text{Capital}} \times \text{Capital Cost}")
-        st.write("This measures the return generated relative to the capital employed.")
-
-        # Additional Notes
-        st.markdown("## Additional Notes")
-        st.markdown("""
-        - All calculations use basis points (bps) where 100 bps = 1%
-        - Negative values are shown in parentheses (e.g., (100))
-        - The drawn percentage affects the weighting of drawn vs. undrawn calculations
-        - Capital costs are typically negative as they represent a cost to the bank
-        """)
-
+        # Whole tab body in one markdown element ($$ blocks render as display math)
+        st.markdown(_EXPLANATION_MD)
 
 if __name__ == "__main__":
     main()